@@ -183,6 +183,13 @@ class DataSetController(IDataSetController):
         finally:
             return self._trajectory
 
+    def clear_data(self) -> None:
+        """Discard the loaded data, e.g. after it was modified in the HDF5
+        file, so that it is re-loaded when next accessed"""
+        self._gravity = DataFrame()
+        self._trajectory = DataFrame()
+        self._dataframe = DataFrame()
+
     def dataframe(self) -> DataFrame:
         if self._dataframe.empty:
             self._dataframe: DataFrame = concat([self.gravity, self.trajectory], axis=1, sort=True)
@@ -18,6 +18,8 @@ from .controller_interfaces import (IAirborneController, IFlightController,
                                     IDataSetController)
 from dgp.core.oid import OID
 from dgp.core.file_loader import FileLoader
+from dgp.core.import_cache import ImportCache
+from dgp.core.time_sync import sync_datasets
 from dgp.core.hdf5_manager import HDF5Manager
 from dgp.core.models.datafile import DataFile
 from dgp.core.models.flight import Flight
@@ -78,6 +80,7 @@ class AirborneProjectController(IAirborneController):
             ('addAction', ('Show in Explorer',
                            lambda: show_in_explorer(self.path))),
             ('addAction', ('Project Properties', self.properties_dlg)),
+            ('addAction', ('Toggle Import Cache', self.toggle_import_cache)),
             ('addAction', ('Close Project', self._close_project))
         ]
 
@@ -217,6 +220,26 @@ class AirborneProjectController(IAirborneController):
             self.log.warning(f"project {self.get_attr('name')} has no parent")
         super().update()
 
+    def sync_datasets(self, processes: int = None, write: bool = False,
+                      window: float = None) -> DataFrame:
+        """Time synchronize the gravity of every DataSet in the project with
+        its trajectory, in a pool of worker processes.
+
+        See :func:`dgp.core.time_sync.sync_datasets` for the parameters and
+        the returned report of delays. If write is True, the DataSet
+        controllers display the new (shifted) gravity DataFile, and re-load
+        their data when next accessed.
+        """
+        report = sync_datasets(self.entity.flights, self.hdfpath,
+                               processes=processes, write=write, window=window)
+        if write:
+            for flight in self.flights.items():
+                for dataset in flight.children:
+                    dataset.get_datafile(DataType.GRAVITY).set_datafile(
+                        dataset.entity.gravity)
+                    dataset.clear_data()
+        return report
+
     def _post_load(self, datafile: DataFile, dataset: IDataSetController,
                    data: DataFrame) -> None:  # pragma: no cover
         """
@@ -263,17 +286,26 @@ class AirborneProjectController(IAirborneController):
         def _on_load(datafile: DataFile, params: dict, parent: IDataSetController):
             if datafile.group is DataType.GRAVITY:
                 method = read_at1a
+                profile = 'at1a_compact'
             elif datafile.group is DataType.TRAJECTORY:
                 method = import_trajectory
+                profile = 'trajectory_compact'
             else:
                 self.log.error("Unrecognized data group: " + datafile.group)
                 return
+            # Record the dtype profile so that it is restored on load
+            datafile.column_format = profile
+            params['dtype_profile'] = profile
             progress_event = ProgressEvent(self.uid, f"Loading "
                                                      f"{datafile.group.value}",
                                            stop=0)
             self.get_parent().progressNotificationRequested.emit(progress_event)
+            cache = None
+            if self.entity.import_cache:
+                cache = ImportCache(max_size=self.entity.import_cache_size)
             loader = FileLoader(datafile.source_path, method,
-                                parent=self.parent_widget, **params)
+                                parent=self.parent_widget,
+                                cache=cache, **params)
             loader.loaded.connect(functools.partial(self._post_load, datafile,
                                                     parent))
             loader.finished.connect(lambda: self.get_parent().progressNotificationRequested.emit(progress_event))
@@ -285,6 +317,21 @@ class AirborneProjectController(IAirborneController):
         dlg.load.connect(_on_load)
         dlg.exec_()
 
+    def toggle_import_cache(self) -> bool:
+        """Enable or disable caching of the frames parsed when importing data
+        into the project, see :class:`~dgp.core.import_cache.ImportCache`
+
+        Returns
+        -------
+        bool
+            True if the import cache is now enabled
+        """
+        self.entity.import_cache = not self.entity.import_cache
+        state = 'enabled' if self.entity.import_cache else 'disabled'
+        self.log.info(f"Import cache {state} for project "
+                      f"{self.get_attr('name')}")
+        return self.entity.import_cache
+
     def properties_dlg(self):  # pragma: no cover
         dlg = ProjectPropertiesDialog(self, parent=self.parent_widget)
         dlg.exec_()
@@ -2,29 +2,36 @@
 import inspect
 import logging
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Optional
 
 from PyQt5.QtCore import QThread
 from PyQt5.QtCore import pyqtSignal
 from pandas import DataFrame
 
+from dgp.core.import_cache import ImportCache
+
 
 class FileLoader(QThread):
     loaded = pyqtSignal(DataFrame, Path)
     error = pyqtSignal(object)
 
-    def __init__(self, path: Path, method: Callable, parent, **kwargs):
+    def __init__(self, path: Path, method: Callable, parent,
+                 cache: Optional[ImportCache] = None, **kwargs):
         super().__init__(parent=parent)
         self.log = logging.getLogger(__name__)
         self._path = Path(path)
         self._method = method
+        self._cache = cache
         self._kwargs = kwargs
 
     def run(self):
         try:
             sig = inspect.signature(self._method)
             kwargs = {k: v for k, v in self._kwargs.items() if k in sig.parameters}
-            result = self._method(str(self._path), **kwargs)
+            if self._cache is not None:
+                result = self._cache.load(self._path, self._method, **kwargs)
+            else:
+                result = self._method(str(self._path), **kwargs)
         except Exception as e:
             self.log.exception("Error loading datafile: %s" % str(self._path))
             self.error.emit(e)
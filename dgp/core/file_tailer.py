@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import inspect
+import io
+import logging
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import QThread
+from PyQt5.QtCore import pyqtSignal
+from pandas import DataFrame, concat
+from pandas.errors import EmptyDataError
+
+from dgp.core.hdf5_manager import HDF5Manager
+from dgp.core.models.datafile import DataFile
+
+
+class FileTailer(QThread):
+    """Follow a data file which is still being written to, and append the
+    newly written records to the HDF5 node of a :class:`DataFile`.
+
+    On each poll only the bytes written since the previous poll are read.
+    Complete lines are parsed with the ingestor ``method`` (e.g.
+    :func:`~dgp.lib.gravity_ingestor.read_at1a`) and appended via
+    :meth:`HDF5Manager.append_data`, so the cost of an update is proportional
+    to the amount of new data rather than to the size of the file.
+    A trailing partial line is left to be read on the next poll. Complete
+    lines which cannot be parsed are skipped, with a warning and an
+    :attr:`error` signal, so that they do not hold back the data after them.
+
+    Keyword arguments are passed to the ingestor method as with the
+    :class:`~dgp.core.file_loader.FileLoader`, except for ``skiprows``, which
+    is only applied to the first read from the start of the file. A number of
+    header rows is skipped by the tailer itself, once all of them have been
+    written, so that a file holding only its header yields no data.
+    Gravity data is read with ``fill_with_nans=False`` by default, as gaps
+    cannot be filled consistently across separately appended blocks.
+
+    """
+    appended = pyqtSignal(DataFrame)
+    error = pyqtSignal(object)
+
+    def __init__(self, path: Path, method: Callable, datafile: DataFile,
+                 hdfpath: Path, parent=None, interval: int = 1000, **kwargs):
+        super().__init__(parent=parent)
+        self.log = logging.getLogger(__name__)
+        self._path = Path(path)
+        self._method = method
+        self._datafile = datafile
+        self._hdfpath = Path(hdfpath)
+        self._interval = interval
+        self._offset = 0
+
+        sig = inspect.signature(self._method)
+        if 'fill_with_nans' in sig.parameters:
+            kwargs.setdefault('fill_with_nans', False)
+        self._kwargs = {k: v for k, v in kwargs.items() if k in sig.parameters}
+
+    @property
+    def offset(self) -> int:
+        """Byte offset in the file up to which data has been ingested"""
+        return self._offset
+
+    def poll(self) -> Optional[DataFrame]:
+        """Ingest any complete lines written since the last poll
+
+        Returns
+        -------
+        DataFrame or None
+            The newly appended data, or None if no complete lines have been
+            written since the last poll.
+
+        """
+        with self._path.open('rb') as fd:
+            fd.seek(0, io.SEEK_END)
+            if fd.tell() < self._offset:
+                self.log.warning(f"File {self._path!s} was truncated, "
+                                 f"restarting from the beginning")
+                self._offset = 0
+            fd.seek(self._offset)
+            block = fd.read()
+
+        end = block.rfind(b'\n')
+        if end < 0:
+            return None
+        block = block[:end + 1]
+
+        kwargs = dict(self._kwargs)
+        skiprows = kwargs.pop('skiprows', None)
+        if self._offset == 0 and isinstance(skiprows, int):
+            # consume the header rows once they have all been written
+            header = 0
+            for _ in range(skiprows):
+                header = block.find(b'\n', header) + 1
+                if not header:
+                    return None
+            self._offset = header
+            block = block[header:]
+        elif self._offset == 0 and skiprows is not None:
+            kwargs['skiprows'] = skiprows
+
+        frames = self._parse(block, kwargs) if block.strip() else []
+        if not frames:
+            self._offset += len(block)
+            return None
+        data = concat(frames)
+
+        # Integer columns may be up-cast to float in blocks containing gaps,
+        # store them as float so that all blocks can be appended to the table
+        integers = data.select_dtypes(include=['integer']).columns
+        data = data.astype({column: float for column in integers})
+
+        HDF5Manager.append_data(data, self._datafile, self._hdfpath)
+        self._offset += len(block)
+        self.appended.emit(data)
+        return data
+
+    def _parse(self, block: bytes, kwargs: dict) -> List[DataFrame]:
+        """Parse a block of complete lines with the ingestor method
+
+        If the block cannot be parsed it is split in half and each half is
+        parsed in turn, down to single lines, which are skipped. Only the
+        malformed lines are lost, at the cost of a few more parses for each.
+        """
+        try:
+            data = self._method(io.StringIO(block.decode()), **kwargs)
+        except EmptyDataError:
+            # the block holds no data rows
+            return []
+        except ValueError as e:
+            lines = block.splitlines(keepends=True)
+            if len(lines) == 1:
+                self.log.warning(f"Skipping malformed line of datafile "
+                                 f"{self._path!s}: {block!r} ({e!s})")
+                self.error.emit(e)
+                return []
+            half = len(lines) // 2
+            # skiprows only applies from the start of the file
+            tail_kwargs = {k: v for k, v in kwargs.items() if k != 'skiprows'}
+            return (self._parse(b''.join(lines[:half]), kwargs) +
+                    self._parse(b''.join(lines[half:]), tail_kwargs))
+        if data is None or data.empty:
+            return []
+        return [data]
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            try:
+                self.poll()
+            except (ValueError, OSError) as e:
+                # e.g. the HDF5 file is locked, or the new data does not fit
+                # the stored table. The offset is not advanced, so the block
+                # is appended on the next poll
+                self.log.warning("Unable to append new data of datafile %s: %s"
+                                 % (str(self._path), str(e)))
+                self.error.emit(e)
+            except Exception as e:
+                self.log.exception("Error tailing datafile: %s" % str(self._path))
+                self.error.emit(e)
+                return
+            self.msleep(self._interval)
@@ -5,10 +5,12 @@ from pathlib import Path
 from typing import Any
 
 import tables
+import pandas
 import pandas.io.pytables
 from pandas import HDFStore, DataFrame
 
 from dgp.core.models.datafile import DataFile
+from dgp.lib.dtype_profiles import DTYPE_PROFILES, apply_dtype_profile
 
 __all__ = ['HDF5Manager']
 # Suppress PyTables warnings due to mixed data-types (typically NaN's in cols)
@@ -41,7 +43,8 @@ class HDF5Manager:
     _cache = {}
 
     @classmethod
-    def save_data(cls, data: DataFrame, datafile: DataFile, path: Path) -> bool:
+    def save_data(cls, data: DataFrame, datafile: DataFile, path: Path,
+                  cache: bool = True) -> bool:
         """
         Save a Pandas Series or DataFrame to the HDF5 Store
 
@@ -56,6 +59,9 @@ class HDF5Manager:
             The DataFile metadata associated with the supplied data
         path : Path
             Path to the HDF5 file
+        cache : bool, optional
+            If False the data is not added to the local cache, and any data
+            previously cached for the DataFile is discarded
 
         Returns
         -------
@@ -69,7 +75,10 @@ class HDF5Manager:
 
         """
 
-        cls._cache[datafile] = data
+        if cache:
+            cls._cache[datafile] = data
+        else:
+            cls._cache.pop(datafile, None)
 
         with HDFStore(str(path)) as hdf:
             try:
@@ -83,7 +92,62 @@ class HDF5Manager:
         return True
 
     @classmethod
-    def load_data(cls, datafile: DataFile, path: Path) -> DataFrame:
+    def append_data(cls, data: DataFrame, datafile: DataFile, path: Path) -> bool:
+        """
+        Append rows of a Pandas DataFrame to the HDF5 Store
+
+        Rows are appended to the node of the datafile, which is created if it
+        does not exist. Nodes are stored in the appendable 'table' format, so
+        the cost of an append is proportional to the size of the new data;
+        a node previously written in the 'fixed' format by :meth:`save_data`
+        is rewritten once in the 'table' format.
+
+        Any cached copy of the data is invalidated, and will be re-read from
+        the HDF5 file on the next call to :meth:`load_data`.
+
+        Parameters
+        ----------
+        data : DataFrame
+            Rows to be appended, with the same columns and dtypes as the
+            stored data.
+        datafile : DataFile
+            The DataFile metadata associated with the supplied data
+        path : Path
+            Path to the HDF5 file
+
+        Returns
+        -------
+        bool:
+            True on successful append
+
+        """
+        cls._cache.pop(datafile, None)
+        rows = len(data)
+
+        with HDFStore(str(path)) as hdf:
+            try:
+                storer = hdf.get_storer(datafile.nodepath)
+            except KeyError:
+                storer = None
+
+            try:
+                if storer is not None and not storer.is_table:
+                    data = pandas.concat([hdf.get(datafile.nodepath), data])
+                    hdf.put(datafile.nodepath, data, format='table')
+                else:
+                    hdf.append(datafile.nodepath, data, format='table')
+            except (IOError, PermissionError):  # pragma: no cover
+                cls.log.exception("Exception appending to HDF5 _store.")
+                raise
+            else:
+                cls.log.debug(f"Appended {rows} rows to HDF5 _store at "
+                              f"node: {datafile.nodepath}")
+
+        return True
+
+    @classmethod
+    def load_data(cls, datafile: DataFile, path: Path,
+                  cache: bool = True) -> DataFrame:
         """
         Load data from a managed repository by UID
         This public method is a dispatch mechanism that calls the relevant
@@ -91,11 +155,18 @@ class HDF5Manager:
         This method will first check the local cache for UID, and if the key
         is not located, will load it from the HDF5 Data File.
 
+        If the DataFile's column_format names a dtype profile (see
+        :mod:`dgp.lib.dtype_profiles`), the loaded data is cast according to
+        the profile.
+
         Parameters
         ----------
         datafile : DataFile
         path : Path
             Path to the HDF5 file where datafile is stored
+        cache : bool, optional
+            If False, data loaded from the HDF5 file is not added to the cache,
+            e.g. when processing many files in turn
 
         Returns
         -------
@@ -123,8 +194,12 @@ class HDF5Manager:
                 cls.log.exception(e)
                 raise
 
+            if datafile.column_format in DTYPE_PROFILES:
+                data = apply_dtype_profile(data, datafile.column_format)
+
             # Cache the data
-            cls._cache[datafile] = data
+            if cache:
+                cls._cache[datafile] = data
             return data
 
     @classmethod
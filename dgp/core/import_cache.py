@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+from dgp import __version__
+
+__all__ = ['ImportCache']
+
+DEFAULT_CACHE_DIR = Path.home().joinpath('.dgp', 'import_cache')
+DEFAULT_MAX_SIZE = 2 << 30  # bytes
+
+
+class ImportCache:
+    """ImportCache stores the DataFrames produced by the raw data ingestors,
+    so that importing the same source file with the same parameters a second
+    time is a cache read instead of a parse.
+
+    Entries are keyed on a hash of the content of the source file (so renamed
+    or copied files share an entry, and modified files do not), combined with
+    the name of the ingestor method and its keyword arguments, the DGP version
+    and the ``CACHE_VERSION`` of the ingestor module, which is incremented
+    whenever the frames produced by its ingestors change.
+    Frames are stored in the binary pickle format in the cache directory.
+    The least recently used entries are evicted when the total size of the
+    cache exceeds ``max_size``.
+
+    Parameters
+    ----------
+    directory : Path, optional
+        Directory where cached frames are stored. Defaults to a directory in
+        the user's home directory, shared by all projects.
+    max_size : int, optional
+        Maximum size of the cache directory in bytes, 2 GiB by default
+
+    """
+    log = logging.getLogger(__name__)
+    _BLOCK_SIZE = 1 << 20
+
+    def __init__(self, directory: Optional[Path] = None,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        self.directory = Path(directory or DEFAULT_CACHE_DIR)
+        self.max_size = max_size
+
+    @classmethod
+    def file_hash(cls, path: Path) -> str:
+        """Compute the SHA-1 hash of the content of a file"""
+        digest = hashlib.sha1()
+        with Path(path).open('rb') as fd:
+            for block in iter(lambda: fd.read(cls._BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @classmethod
+    def key(cls, path: Path, method: Callable, **kwargs) -> str:
+        """Generate the cache key for a source file imported by method with
+        the given keyword arguments"""
+        name = f'{method.__module__}.{method.__qualname__}'
+        module = sys.modules.get(method.__module__)
+        version = f'{__version__}/{getattr(module, "CACHE_VERSION", 0)}'
+        params = json.dumps(kwargs, sort_keys=True, default=repr)
+        digest = hashlib.sha1(cls.file_hash(path).encode())
+        digest.update(name.encode())
+        digest.update(version.encode())
+        digest.update(params.encode())
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.directory.joinpath(f'{key}.pkl')
+
+    def get(self, key: str) -> Optional[DataFrame]:
+        """Retrieve a cached frame, or None if key is not in the cache"""
+        entry = self._entry(key)
+        if not entry.exists():
+            return None
+        try:
+            data = pd.read_pickle(str(entry))
+            # the modification time orders the entries for eviction
+            os.utime(str(entry))
+            return data
+        except Exception:
+            self.log.exception(f"Error reading import cache entry {entry!s}")
+            return None
+
+    def put(self, key: str, data: DataFrame) -> None:
+        """Store a frame in the cache"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entry = self._entry(key)
+        tmp = entry.with_suffix('.tmp')
+        data.to_pickle(str(tmp))
+        os.replace(str(tmp), str(entry))
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the size of the cache
+        is within max_size"""
+        if not self.directory.exists():
+            return
+        entries = []
+        for entry in self.directory.glob('*.pkl'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, entry in sorted(entries, key=lambda e: e[0]):
+            if size <= self.max_size:
+                break
+            try:
+                entry.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            self.log.debug(f"Evicted {entry!s} from import cache.")
+
+    def load(self, path: Path, method: Callable, **kwargs) -> DataFrame:
+        """Load the frame produced by ``method(path, **kwargs)`` from the
+        cache, or call the method and cache its result"""
+        key = self.key(path, method, **kwargs)
+        data = self.get(key)
+        if data is not None:
+            self.log.info(f"Loaded {path!s} from import cache.")
+            return data
+
+        data = method(str(path), **kwargs)
+        try:
+            self.put(key, data)
+        except OSError:
+            self.log.exception(f"Error writing {path!s} to import cache.")
+        return data
+
+    def clear(self) -> None:
+        """Remove all entries from the cache"""
+        if self.directory.exists():
+            for entry in self.directory.glob('*.pkl'):
+                entry.unlink()
@@ -74,6 +74,9 @@ class DataSet:
         Optional Gravity DataFile to initialize this DataSet with
     trajectory : :obj:`DataFile`, optional
         Optional Trajectory DataFile to initialize this DataSet with
+    raw_gravity : :obj:`DataFile`, optional
+        The originally imported Gravity DataFile, if the gravity was replaced
+        by a time synchronized copy (see :func:`dgp.core.time_sync.sync_datasets`)
     segments : List[:obj:`DataSegment`], optional
         Optional list of DataSegment's to initialize this DataSet with
     uid
@@ -86,7 +89,8 @@ class DataSet:
     """
     def __init__(self, gravity: DataFile = None, trajectory: DataFile = None,
                  segments: List[DataSegment]=None, sensor=None,
-                 name: str = None, uid: OID = None):
+                 name: str = None, uid: OID = None,
+                 raw_gravity: DataFile = None):
         self.uid = uid or OID(self)
         self.uid.set_pointer(self)
         self.name = name or "Data Set"
@@ -95,6 +99,7 @@ class DataSet:
 
         self.gravity: DataFile = gravity
         self.trajectory: DataFile = trajectory
+        self.raw_gravity: DataFile = raw_gravity
 
     @property
     def sensor(self):
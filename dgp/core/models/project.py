@@ -9,6 +9,7 @@ from typing import Optional, List, Any, Dict, Union, Tuple, Callable
 from dgp.core import DataType
 from dgp.core.types.reference import Reference
 from dgp.core.oid import OID
+from dgp.core.import_cache import DEFAULT_MAX_SIZE
 from .flight import Flight
 from .meter import Gravimeter
 from .dataset import DataSet, DataSegment
@@ -223,6 +224,11 @@ class GravityProject:
         Optional, description for the project
     create_date : :class:`datetime`, optional
         Specify creation date of the project, current UTC time is used if None
+    import_cache : bool, optional
+        Keep the parsed frames of imported files in the shared import cache
+        (see :class:`~dgp.core.import_cache.ImportCache`), False by default
+    import_cache_size : int, optional
+        Maximum size of the import cache in bytes, if enabled
     modify_date : :class:`datetime`, optional
         This parameter should be used only during the de-serialization process,
         otherwise the modification date is automatically handled by the class
@@ -246,6 +252,9 @@ class GravityProject:
         self._description = description or ""
         self.create_date = create_date or datetime.datetime.utcnow()
         self.modify_date = modify_date or datetime.datetime.utcnow()
+        self.import_cache: bool = kwargs.get('import_cache', False)
+        self.import_cache_size: int = kwargs.get('import_cache_size',
+                                                 DEFAULT_MAX_SIZE)
 
         self._gravimeters = kwargs.get('gravimeters', [])  # type: List[Gravimeter]
 
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pandas import DataFrame
+
+from dgp.core import DataType
+from dgp.core.hdf5_manager import HDF5Manager
+from dgp.core.models.datafile import DataFile
+from dgp.core.models.dataset import DataSet
+from dgp.core.models.flight import Flight
+from dgp.lib.dtype_profiles import DTYPE_PROFILES
+from dgp.lib.timesync import (find_time_delay, find_time_delays,
+                              fractional_shift, shift_frame_varying)
+from dgp.lib.transform.gravity import kinematic_accel
+
+__all__ = ['sync_datasets']
+_log = logging.getLogger(__name__)
+
+# Samples at each end of the kinematic acceleration affected by the
+# differentiating filters
+KIN_ACCEL_EDGE = 10
+
+
+def _sync_frames(gravity: DataFrame, trajectory: DataFrame,
+                 window: Optional[float] = None, shift: bool = False,
+                 nearest: Tuple[str, ...] = ()):
+    """Compute the delay of a gravity frame relative to the kinematic
+    acceleration of its trajectory, and optionally the shifted gravity.
+
+    This runs in a worker process, and so only deals with DataFrames.
+    """
+    kin_accel = kinematic_accel(trajectory)
+    kin_accel = kin_accel.iloc[KIN_ACCEL_EDGE:-KIN_ACCEL_EDGE]
+    # correlate the samples of both over their common time span
+    start = max(kin_accel.index[0], gravity.index[0])
+    end = min(kin_accel.index[-1], gravity.index[-1])
+    kin_accel = kin_accel[start:end]
+    raw_grav = fractional_shift(gravity['gravity'], 0, index=kin_accel.index,
+                                method='linear')
+    raw_grav = raw_grav.fillna(method='bfill').fillna(method='ffill')
+
+    # as in shift_frames, a positive delay shifts the gravity forward in time
+    if window is None:
+        delay = find_time_delay(raw_grav, kin_accel)
+        shifted = (fractional_shift(gravity, delay, nearest=nearest)
+                   if shift else None)
+    else:
+        delays = find_time_delays(raw_grav, kin_accel, window=window,
+                                  processes=1)
+        shifted = (shift_frame_varying(gravity, delays, nearest=nearest)
+                   if shift else None)
+        delay = delays.median()
+    return delay, shifted
+
+
+def _integer_columns(datafile: DataFile) -> Tuple[str, ...]:
+    """Columns stored as integers (e.g. status words) by the dtype profile of
+    a DataFile, which must not be interpolated when shifting"""
+    profile = DTYPE_PROFILES.get(datafile.column_format, {})
+    return tuple(col for col, dtype in profile.items()
+                 if np.dtype(dtype).kind in 'iub')
+
+
+def _synced_datafile(dataset: DataSet) -> DataFile:
+    """DataFile of the time synchronized gravity of a DataSet, which is kept
+    apart from the originally imported gravity"""
+    if dataset.raw_gravity is not None:
+        # overwrite the node of the previous synchronization
+        return dataset.gravity
+    raw = dataset.gravity
+    return DataFile(DataType.GRAVITY, raw.date, raw.source_path,
+                    name=f'{raw.name} (synced)',
+                    column_format=raw.column_format)
+
+
+def sync_datasets(flights: List[Flight], hdfpath: Path,
+                  processes: Optional[int] = None, write: bool = False,
+                  window: Optional[float] = None) -> DataFrame:
+    """Time synchronize the gravity of every DataSet with both gravity and
+    trajectory data.
+
+    The gravity and trajectory of each DataSet are loaded through the
+    :class:`HDF5Manager` (without caching them), then the kinematic
+    acceleration and the delay of the gravity relative to it are computed in a
+    pool of worker processes. DataSets are loaded as workers become available,
+    so at most one DataSet per worker is held in memory at a time.
+
+    The delay is always computed for the originally imported gravity of a
+    DataSet, so synchronizing again gives the same result.
+
+    Parameters
+    ----------
+    flights : List[:obj:`Flight`]
+        Flights whose DataSets are to be synchronized, e.g. the flights of an
+        AirborneProject
+    hdfpath : Path
+        Path to the project HDF5 file
+    processes : int, optional
+        Number of worker processes, by default the number of processors
+    write : bool, optional
+        If True, the gravity of each synchronized DataSet is shifted by its
+        delay (see :func:`dgp.lib.timesync.fractional_shift`) and written to
+        a new node in the HDF5 file, which replaces the gravity DataFile of
+        the DataSet. The originally imported gravity is kept as the
+        raw_gravity of the DataSet. Integer columns of the gravity dtype
+        profile, such as the status word, take the nearest sample.
+    window : float, optional
+        If given, a time-varying delay is estimated over sliding windows of
+        this many seconds (see :func:`dgp.lib.timesync.find_time_delays`),
+        and the median delay is reported.
+
+    Returns
+    -------
+    DataFrame
+        One row per DataSet, indexed by the DataSet UID, with columns 'flight'
+        and 'dataset' (names), 'delay' and 'error' (the error message if the
+        DataSet could not be synchronized). The delay is the shift in seconds
+        which synchronizes the gravity, forward in time if positive, i.e. it
+        is negative for gravity lagging the trajectory. It is NaN on failure.
+
+    """
+    pairs: List[Tuple[Flight, DataSet]] = [
+        (flight, dataset) for flight in flights for dataset in flight.datasets
+        if dataset.gravity is not None and dataset.trajectory is not None
+    ]
+    report = DataFrame(index=[str(ds.uid) for _, ds in pairs],
+                       columns=['flight', 'dataset', 'delay', 'error'])
+    report['flight'] = [flt.name for flt, _ in pairs]
+    report['dataset'] = [ds.name for _, ds in pairs]
+    report['delay'] = np.nan
+
+    def _collect(dataset: DataSet, future):
+        uid = str(dataset.uid)
+        try:
+            delay, shifted = future.result()
+        except Exception as e:
+            _log.exception(f'Unable to synchronize DataSet {dataset.name}')
+            report.at[uid, 'error'] = f'{type(e).__name__}: {e}'
+            return
+
+        report.at[uid, 'delay'] = delay
+        _log.info(f'DataSet {dataset.name} gravity delay: {delay:.3f} s')
+        if write and shifted is not None:
+            synced = _synced_datafile(dataset)
+            HDF5Manager.save_data(shifted, synced, hdfpath, cache=False)
+            dataset.raw_gravity = dataset.raw_gravity or dataset.gravity
+            dataset.gravity = synced
+
+    worker = partial(_sync_frames, window=window, shift=write)
+    limit = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        running = {}
+        for _, dataset in pairs:
+            source = dataset.raw_gravity or dataset.gravity
+            try:
+                gravity = HDF5Manager.load_data(source, hdfpath, cache=False)
+                trajectory = HDF5Manager.load_data(dataset.trajectory, hdfpath,
+                                                   cache=False)
+            except (KeyError, FileNotFoundError) as e:
+                _log.exception(f'Unable to load data of DataSet {dataset.name}')
+                report.at[str(dataset.uid), 'error'] = f'{type(e).__name__}: {e}'
+                continue
+            future = executor.submit(worker, gravity, trajectory,
+                                     nearest=_integer_columns(source))
+            running[future] = dataset
+            del gravity, trajectory
+
+            # bound the number of DataSets in flight
+            if len(running) >= limit:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect(running.pop(future), future)
+
+        for future in list(running):
+            _collect(running.pop(future), future)
+
+    return report
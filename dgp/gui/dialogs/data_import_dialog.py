@@ -15,6 +15,7 @@ from dgp.core.controllers.gravimeter_controller import GravimeterController
 from dgp.core.controllers.dataset_controller import DataSetController
 from dgp.core.controllers.controller_interfaces import IAirborneController, IFlightController, IDataSetController
 from dgp.core.models.datafile import DataFile
+from dgp.lib.trajectory_ingestor import sniff_trajectory
 from dgp.gui.ui.data_import_dialog import Ui_DataImportDialog
 from .dialog_mixins import FormValidator
 from .custom_validators import FileExistsValidator
@@ -50,8 +51,9 @@ class DataImportDialog(QDialog, Ui_DataImportDialog, FormValidator):
             },
             DataType.TRAJECTORY: {
                 'timeformat': lambda: self.qcb_traj_timeformat.currentText().lower(),
-                'columns': lambda: self.qcb_traj_timeformat.currentData(Qt.UserRole),
-                'skiprows': lambda: 1 if self.qchb_traj_hasheader.isChecked() else 0,
+                'columns': lambda: self._traj_columns(),
+                'skiprows': lambda: self._traj_header_rows if self.qchb_traj_hasheader.isChecked() else 0,
+                'sep': lambda: self._traj_sep,
                 'is_utc': lambda: self.qchb_traj_isutc.isChecked()
             }
         }
@@ -84,6 +86,11 @@ class DataImportDialog(QDialog, Ui_DataImportDialog, FormValidator):
         self.qcb_gravimeter.setCurrentIndex(0)
 
         # Trajectory Widget
+        self._traj_header_rows = 1
+        self._traj_sep = ','
+        # Format sniffed from the selected trajectory file, kept apart from
+        # the default columns of each time format
+        self._traj_profile: Optional[dict] = None
         self._traj_timeformat_model = QStandardItemModel()
         self.qcb_traj_timeformat.setModel(self._traj_timeformat_model)
         self.qcb_traj_timeformat.currentIndexChanged.connect(self._traj_timeformat_changed)
@@ -168,6 +175,8 @@ class DataImportDialog(QDialog, Ui_DataImportDialog, FormValidator):
         param_map = self._params_map[self.datatype]
         params = {key: value() for key, value in param_map.items()}
         self.load.emit(file, params, self.dataset)
+        if self.datatype is DataType.TRAJECTORY:
+            self._save_traj_profile(params)
 
         if self.qchb_copy_file.isChecked():
             self._copy_file()
@@ -227,6 +236,50 @@ class DataImportDialog(QDialog, Ui_DataImportDialog, FormValidator):
         self.qle_linecount.setText(str(line_count))
         self.qle_colcount.setText(str(col_count))
 
+        if self.datatype is DataType.TRAJECTORY:
+            self._sniff_trajectory(path)
+
+    def _sniff_trajectory(self, path: Path):  # pragma: no cover
+        """Pre-select the trajectory format detected from the file"""
+        try:
+            # the profile is only stored once the import is accepted
+            profile = sniff_trajectory(str(path), cache=False)
+        except (OSError, ValueError, UnicodeDecodeError):
+            self.log.debug("Unable to detect the trajectory format of %s", path)
+            self._traj_profile = None
+            self._traj_sep = ','
+            self._traj_header_rows = 1
+            self._traj_timeformat_changed(self.qcb_traj_timeformat.currentIndex())
+            return
+        index = self.qcb_traj_timeformat.findText(profile['timeformat'], Qt.MatchFixedString)
+        self._traj_profile = profile
+        self._traj_sep = profile['sep']
+        self._traj_header_rows = profile['skiprows'] or 1
+        self.qchb_traj_hasheader.setChecked(bool(profile['skiprows']))
+        self.qcb_traj_timeformat.setCurrentIndex(index)
+        self._traj_timeformat_changed(index)
+
+    def _traj_columns(self) -> List[str]:
+        """Columns of the selected time format, as sniffed from the file if it
+        was detected in that format"""
+        profile = self._traj_profile
+        if profile is not None and profile['timeformat'] == self.qcb_traj_timeformat.currentText().lower():
+            return list(profile['columns'])
+        return self.qcb_traj_timeformat.currentData(Qt.UserRole)
+
+    def _save_traj_profile(self, params: dict):  # pragma: no cover
+        """Store the sniffed trajectory profile in the directory of the file, if
+        it was imported with the sniffed format"""
+        profile = self._traj_profile
+        if profile is None:
+            return
+        if any(params[key] != profile[key] for key in ('timeformat', 'columns', 'sep', 'skiprows')):
+            return
+        try:
+            sniff_trajectory(str(self.file_path))
+        except (OSError, ValueError, UnicodeDecodeError):
+            self.log.debug("Unable to store the trajectory profile of %s", self.file_path)
+
     @pyqtSlot(int, name='_gravimeter_changed')
     def _gravimeter_changed(self, index: int):  # pragma: no cover
         meter_ctrl = self.project.meter_model.item(index)
@@ -240,8 +293,7 @@ class DataImportDialog(QDialog, Ui_DataImportDialog, FormValidator):
 
     @pyqtSlot(int, name='_traj_timeformat_changed')
     def _traj_timeformat_changed(self, index: int):  # pragma: no cover
-        timefmt = self._traj_timeformat_model.item(index)
-        cols = ', '.join(timefmt.data(Qt.UserRole))
+        cols = ', '.join(col or '-' for col in self._traj_columns())
         self.qle_traj_format.setText(cols)
 
     @pyqtSlot(int, name='_flight_changed')
@@ -48,6 +48,8 @@ class TransformWidget(QWidget, Ui_TransformInterface):
         self._segment_indexes = {}
 
         self._result: pd.DataFrame = None
+        # Graph of the last execution, reused to recompute only changed nodes
+        self._graph: TransformGraph = None
         self.result.connect(self._on_result)
 
         # Line mask to view individual lines
@@ -255,9 +257,16 @@ class TransformWidget(QWidget, Ui_TransformInterface):
             return
 
         transform = self.qcb_transform_graphs.currentData(Qt.UserRole)
-        graph = transform(trajectory, gravity, 0, 0)
+        graph = self._graph
+        if type(graph) is transform:
+            graph.set_node('trajectory', trajectory)
+            graph.set_node('gravity', gravity)
+        else:
+            graph = self._graph = transform(trajectory, gravity, 0, 0)
         self.log.info("Executing graph")
-        graph.execute()
+        # release intermediate results not needed for the result frame
+        graph.execute(executor='thread',
+                      outputs=getattr(graph, 'result_nodes', None))
         del self._result
         self._result = graph.result_df()
         self.result.emit()
@@ -0,0 +1,111 @@
+# coding: utf-8
+
+"""
+dtype_profiles.py
+Compact dtype profiles for ingested data frames
+
+A dtype profile maps column names to the dtype the column is stored with.
+Sensor channels are down-cast to float32 where float32 resolution is well
+below the sensor noise, while channels needing more than ~7 significant
+digits (e.g. gravity, GPS seconds of week, latitude and longitude) are kept
+as float64.
+
+"""
+import numpy as np
+
+DTYPE_PROFILES = {
+    'at1a_compact': {
+        'gravity': np.float64,
+        'long_accel': np.float32,
+        'cross_accel': np.float32,
+        'beam': np.float32,
+        'temp': np.float32,
+        'status': np.uint32,
+        'pressure': np.float32,
+        'Etemp': np.float32,
+        'gps_week': np.uint16,
+        'gps_sow': np.float64,
+    },
+    'trajectory_compact': {
+        'lat': np.float64,
+        'long': np.float64,
+        'ell_ht': np.float32,
+        'ortho_ht': np.float32,
+        'num_sats': np.uint8,
+        'pdop': np.float32,
+    },
+}
+
+# largest integer exactly representable by float32
+_FLOAT32_INT_MAX = 2 ** 24
+
+
+def get_dtype_profile(profile):
+    """
+    Look up a dtype profile
+
+    Parameters
+    ----------
+    profile : str or dict
+        Name of a profile in DTYPE_PROFILES, or a mapping of column names to
+        dtypes.
+
+    Returns
+    -------
+    dict
+
+    Raises
+    ------
+    KeyError
+        If the profile name is not known
+    """
+    if isinstance(profile, str):
+        try:
+            return DTYPE_PROFILES[profile]
+        except KeyError:
+            raise KeyError('dtype profile {profile!r} not recognized'
+                           .format(profile=profile))
+    return profile
+
+
+def apply_dtype_profile(frame, profile):
+    """
+    Cast the columns of a frame according to a dtype profile
+
+    Columns not named in the profile are left unchanged. Integer columns
+    containing NaNs (e.g. rows inserted to fill time gaps) cannot be stored
+    as integers, they are stored as float32 instead if their values are
+    exactly representable, otherwise they are left unchanged.
+
+    Parameters
+    ----------
+    frame : pandas.DataFrame
+    profile : str or dict
+        Name of a profile in DTYPE_PROFILES, or a mapping of column names to
+        dtypes.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    profile = get_dtype_profile(profile)
+
+    dtypes = {}
+    for column in frame.columns:
+        if column not in profile:
+            continue
+
+        dtype = np.dtype(profile[column])
+        values = frame[column]
+        if dtype.kind in 'iu' and values.dtype.kind == 'f' and values.isnull().any():
+            if values.abs().max() < _FLOAT32_INT_MAX:
+                dtype = np.dtype(np.float32)
+            else:
+                continue
+
+        if values.dtype != dtype:
+            dtypes[column] = dtype
+
+    if not dtypes:
+        return frame
+    return frame.astype(dtypes)
@@ -5,6 +5,7 @@ import functools
 import collections
 
 import numpy as np
+import pandas as pd
 
 
 def align_frames(frame1, frame2, align_to='left', interp_method='time',
@@ -142,6 +143,69 @@ def align_frames(frame1, frame2, align_to='left', interp_method='time',
         return left, right
 
 
+def find_gaps(index, interval):
+    """
+    Find the time gaps in a time-like index
+
+    A gap is a span in which one or more samples of a regular time grid are
+    missing. This is an alternative to filling the gaps with NaN rows, which
+    allocates for the whole time span.
+
+    Parameters
+    ----------
+    index: :obj:`DatetimeIndex`
+        Sorted index of the observed samples
+    interval: str or :obj:`Timedelta`
+        Nominal sample interval, e.g. '100000U'
+
+    Returns
+    -------
+    :obj:`DataFrame`
+        Gap table with one row per gap and the columns:
+            - start: time of the first missing sample
+            - stop: time of the last missing sample
+            - count: number of missing samples
+    """
+    interval = pd.to_timedelta(interval)
+    step = interval.value
+
+    ticks = index.asi8
+    deltas = np.diff(ticks)
+
+    # tolerate jitter of up to half an interval
+    positions = np.flatnonzero(deltas > 1.5 * step)
+    count = np.round(deltas[positions] / step).astype(np.int64) - 1
+
+    start = ticks[positions] + step
+    stop = start + (count - 1) * step
+
+    return pd.DataFrame({'start': pd.to_datetime(start),
+                         'stop': pd.to_datetime(stop),
+                         'count': count},
+                        columns=['start', 'stop', 'count'])
+
+
+def split_runs(frame, gaps):
+    """
+    Split a frame into its contiguous runs of samples
+
+    Parameters
+    ----------
+    frame: :obj:`DataFrame` or :obj:`Series`
+        Must have a sorted time-like index
+    gaps: :obj:`DataFrame`
+        Gap table of the frame, as returned by :func:`find_gaps`
+
+    Returns
+    -------
+    list
+        Views of the frame between the gaps, in time order
+    """
+    bounds = frame.index.searchsorted(gaps['start'].values)
+    bounds = np.concatenate([[0], bounds, [len(frame)]])
+    return [frame.iloc[begin:end] for begin, end in zip(bounds[:-1], bounds[1:])]
+
+
 def interp_nans(y):
     # TODO: SettingWithCopyWarning
     nans = np.isnan(y)
@@ -9,12 +9,20 @@ Library for gravity data import functions
 import numpy as np
 import pandas as pd
 import datetime
-import struct
 import fnmatch
 import os
 import re
+import json
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 
-from .time_utils import convert_gps_time
+from .dtype_profiles import apply_dtype_profile, get_dtype_profile
+from .etc import find_gaps
+from .time_utils import convert_gps_time, datetime_from_fields
+
+# Version of the frames produced by the ingestors of this module, increment
+# whenever they change so that stale entries of the ImportCache are not used
+CACHE_VERSION = 1
 
 
 def _extract_bits(bitfield, columns=None, as_bool=False):
@@ -26,6 +34,10 @@ def _extract_bits(bitfield, columns=None, as_bool=False):
     there are in the integer - least signficant bit first - or for as many
     column names that are given.
 
+    The bits are decoded for the whole array at once by shifting the integers
+    against a vector of bit positions, so the cost is a single NumPy pass
+    rather than one Python call per sample.
+
     Parameters
     ----------
     bitfield : numpy.array or pandas.Series
@@ -41,37 +53,164 @@ def _extract_bits(bitfield, columns=None, as_bool=False):
     pandas.DataFrame
 
     """
+    values = np.asarray(bitfield).astype(np.uint64)
 
-    def _unpack_bits(n):
-        x = np.array(struct.unpack('4B', struct.pack('>I', n)), dtype=np.uint8)
-        return np.flip(np.unpackbits(x), axis=0)
-
-    data = bitfield.apply(_unpack_bits)
-    df = pd.DataFrame(np.column_stack(list(zip(*data))))
+    # integers are decoded as 32-bit words unless they need all 64 bits
+    if values.size and values.max() > 0xFFFFFFFF:
+        nbits = 64
+    else:
+        nbits = 32
 
-    # set column names
+    # only decode as many bits as are named
     if columns is not None:
-        # remove fields from the end if not named
-        if len(columns) < len(df.columns):
-            df.drop(df.columns[range(len(columns), len(df.columns))], axis=1, inplace=True)
-            df.columns = columns
-        elif len(columns) > len(df.columns):
-            df.columns = columns[:len(df.columns)]
-        else:
-            df.columns = columns
+        nbits = min(nbits, len(columns))
+
+    shifts = np.arange(nbits, dtype=np.uint64)
+    bits = (values[:, np.newaxis] >> shifts) & np.uint64(1)
 
     if as_bool:
-        return df.astype(np.bool_)
+        bits = bits.astype(np.bool_)
     else:
-        return df
+        bits = bits.astype(np.uint8)
+
+    df = pd.DataFrame(bits)
+
+    # set column names
+    if columns is not None:
+        df.columns = columns[:nbits]
+
+    return df
+
+
+def status_flag(status, name, fields=None):
+    """
+    Decode a single named flag from a packed status word.
+
+    This is the lazy counterpart to :func:`_extract_bits`, for use with
+    frames read with ``expand_status=False`` where the status word is kept
+    packed and flags are only decoded when they are needed.
+
+    Parameters
+    ----------
+    status : numpy.array or pandas.Series
+        Packed status word integers
+    name : str
+        Name of the flag to decode
+    fields : list, optional
+        Flag names in bit order - least significant bit first. Defaults to
+        the DGS AT1A status field names.
+
+    Returns
+    -------
+    numpy.array or pandas.Series
+        Boolean values of the flag. A Series is returned, with the same index,
+        if a Series is given.
+
+    Raises
+    ------
+    KeyError
+        If name is not one of the status fields
+    """
+    if fields is None:
+        fields = DGS_AT1A_STATUS_FIELDS
+
+    try:
+        bit = fields.index(name)
+    except ValueError:
+        raise KeyError('{name!r} is not a status field'.format(name=name))
+
+    values = np.asarray(status)
+    if values.dtype.kind == 'f':
+        # rows inserted to fill time gaps have no status
+        values = np.where(np.isnan(values), 0, values)
+    values = values.astype(np.uint64)
+
+    flag = ((values >> np.uint64(bit)) & np.uint64(1)).astype(np.bool_)
+
+    if isinstance(status, pd.Series):
+        return pd.Series(flag, index=status.index, name=name)
+    return flag
 
 
 DGS_AT1A_INTERP_FIELDS = {'gravity', 'long_accel', 'cross_accel', 'beam',
                           'temp', 'pressure', 'Etemp'}
 
+DGS_AT1A_STATUS_FIELDS = ['clamp', 'unclamp', 'gps_sync', 'feedback',
+                          'reserved1', 'reserved2', 'ad_lock', 'cmd_rcvd',
+                          'nav_mode_1', 'nav_mode_2', 'plat_comm', 'sens_comm',
+                          'gps_input', 'ad_sat', 'long_sat', 'cross_sat',
+                          'on_line']
+
+
+DGS_AT1A_COLUMNS = ['gravity', 'long_accel', 'cross_accel', 'beam', 'temp',
+                    'status', 'pressure', 'Etemp', 'gps_week', 'gps_sow']
+
+DGS_AT1A_INTERVAL = '100000U'
+
+
+def _format_at1a(df, expand_status=True):
+    """
+    Name the columns of a raw AT1A frame, expand the status word and index
+    the frame by GPS time.
+    """
+    columns = list(DGS_AT1A_COLUMNS)
+
+    if len(df.columns) != len(columns):
+        columns += ['unknown']
+
+    df.columns = columns
+
+    # expand status field
+    if expand_status:
+        status = _extract_bits(df['status'], columns=DGS_AT1A_STATUS_FIELDS,
+                               as_bool=True)
+        status.index = df.index
+
+        df = pd.concat([df, status], axis=1)
+        df.drop('status', axis=1, inplace=True)
+
+    # create datetime index
+    dt = convert_gps_time(df['gps_week'], df['gps_sow'], format='datetime')
+    df.index = pd.DatetimeIndex(dt)
+
+    return df
+
+
+def _fill_at1a_gaps(df, start=None):
+    """
+    Fill time gaps in an AT1A frame with NaNs.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Gravity data indexed by datetime
+    start : datetime, optional
+        First time of the filled index. Defaults to the first valid time in
+        the frame. This is used to continue the time grid of a previous chunk.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Gravity data reindexed to a regular time grid
+    """
+    # select rows where time is synced with GPS time
+    # TODO: Does not work. Can show true when time is not synced.
+    # df = df.loc[df['gps_sync']]
+
+    # TODO: This is not perfect either. Sometimes sync of sow lags.
+    df = df.loc[df['gps_week'] > 0]
+
+    if start is None:
+        start = df.index[0]
+
+    # fill gaps with NaNs
+    index = pd.date_range(start, df.index[-1], freq=DGS_AT1A_INTERVAL)
+    return df.reindex(index)
+
 
 def read_at1a(path, columns=None, fill_with_nans=True, interp=False,
-              skiprows=None):
+              skiprows=None, expand_status=True, gaps=False,
+              dtype_profile=None):
     """
     Read and parse gravity data file from DGS AT1A (Airborne) meter.
 
@@ -92,53 +231,45 @@ def read_at1a(path, columns=None, fill_with_nans=True, interp=False,
     interp : boolean, default False
         Interpolate all NaNs for fields of type numpy.number
     skiprows
+    expand_status : boolean, default True
+        Expand the status word into one boolean column per flag. If False,
+        the packed 'status' column is kept and flags can be decoded on demand
+        with :func:`status_flag`.
+    gaps : boolean, default False
+        Do not fill time gaps with NaNs. Instead, only the observed samples
+        are kept and a gap table (see :func:`~dgp.lib.etc.find_gaps`) is
+        returned along with the data. Takes precedence over fill_with_nans.
+    dtype_profile : str or dict, optional
+        Name of a dtype profile (e.g. 'at1a_compact', see
+        :mod:`~dgp.lib.dtype_profiles`) or mapping of column names to dtypes,
+        used to store the data compactly. If the profile includes the
+        'status' column, the status word is kept packed.
 
     Returns
     -------
     pandas.DataFrame
         Gravity data indexed by datetime.
+    (pandas.DataFrame, pandas.DataFrame)
+        Gravity data and the gap table, if gaps is True.
     """
-    columns = ['gravity', 'long_accel', 'cross_accel', 'beam',
-                          'temp', 'status', 'pressure', 'Etemp', 'gps_week',
-                          'gps_sow']
+    if dtype_profile is not None:
+        dtype_profile = get_dtype_profile(dtype_profile)
+        if 'status' in dtype_profile:
+            expand_status = False
 
     df = pd.read_csv(path, header=None, engine='c', na_filter=False,
                      skiprows=skiprows)
+    df = _format_at1a(df, expand_status=expand_status)
 
-    if len(df.columns) != len(columns):
-        columns += ['unknown']
-
-    df.columns = columns
-
-    # expand status field
-    status_field_names = ['clamp', 'unclamp', 'gps_sync', 'feedback',
-                          'reserved1', 'reserved2', 'ad_lock', 'cmd_rcvd',
-                          'nav_mode_1', 'nav_mode_2', 'plat_comm', 'sens_comm',
-                          'gps_input', 'ad_sat', 'long_sat', 'cross_sat',
-                          'on_line']
-
-    status = _extract_bits(df['status'], columns=status_field_names,
-                           as_bool=True)
-
-    df = pd.concat([df, status], axis=1)
-    df.drop('status', axis=1, inplace=True)
-
-    # create datetime index
-    dt = convert_gps_time(df['gps_week'], df['gps_sow'], format='datetime')
-    df.index = pd.DatetimeIndex(dt)
-
-    if fill_with_nans:
-        # select rows where time is synced with GPS time
-        # TODO: Does not work. Can show true when time is not synced.
-        # df = df.loc[df['gps_sync']]
-
+    if gaps:
         # TODO: This is not perfect either. Sometimes sync of sow lags.
         df = df.loc[df['gps_week'] > 0]
+        if dtype_profile is not None:
+            df = apply_dtype_profile(df, dtype_profile)
+        return df, find_gaps(df.index, DGS_AT1A_INTERVAL)
 
-        # fill gaps with NaNs
-        interval = '100000U'
-        index = pd.date_range(df.index[0], df.index[-1], freq=interval)
-        df = df.reindex(index)
+    if fill_with_nans:
+        df = _fill_at1a_gaps(df)
 
     # TODO: Replace interp_nans with pandas interpolate
     if interp:
@@ -149,9 +280,73 @@ def read_at1a(path, columns=None, fill_with_nans=True, interp=False,
         for col in numeric.columns:
             df[col] = numeric[col]
 
+    if dtype_profile is not None:
+        df = apply_dtype_profile(df, dtype_profile)
+
     return df
 
 
+def iter_at1a(path, chunksize=100000, fill_with_nans=True, skiprows=None,
+              expand_status=True, dtype_profile=None):
+    """
+    Read and parse a gravity data file from a DGS AT1A meter in chunks.
+
+    This is the streaming counterpart to :func:`read_at1a`. Only one chunk of
+    the file is held in memory at a time, which allows long continuous
+    recordings to be ingested with bounded memory.
+
+    Parameters
+    ----------
+    path : str
+        Filesystem path to gravity data file
+    chunksize : int, default 100000
+        Number of lines of the file to read per chunk
+    fill_with_nans : boolean, default True
+        Fills time gaps with NaNs for all fields. The time grid is continued
+        across chunks, so gaps falling between two chunks are filled at the
+        start of the later chunk.
+    skiprows
+    expand_status : boolean, default True
+        Expand the status word into one boolean column per flag.
+    dtype_profile : str or dict, optional
+        dtype profile applied to each chunk, see :func:`read_at1a`
+
+    Yields
+    ------
+    pandas.DataFrame
+        Gravity data indexed by datetime.
+    """
+    reader = pd.read_csv(path, header=None, engine='c', na_filter=False,
+                         skiprows=skiprows, chunksize=chunksize)
+
+    if dtype_profile is not None:
+        dtype_profile = get_dtype_profile(dtype_profile)
+        if 'status' in dtype_profile:
+            expand_status = False
+
+    interval = pd.to_timedelta(DGS_AT1A_INTERVAL)
+    last = None
+    for chunk in reader:
+        df = _format_at1a(chunk, expand_status=expand_status)
+
+        if fill_with_nans:
+            valid = df.index[df['gps_week'] > 0]
+            if len(valid) == 0:
+                continue
+
+            start = None if last is None else last + interval
+            if start is not None and start > valid[-1]:
+                continue
+
+            df = _fill_at1a_gaps(df, start=start)
+            last = df.index[-1]
+
+        if dtype_profile is not None:
+            df = apply_dtype_profile(df, dtype_profile)
+
+        yield df
+
+
 def _parse_zls_file_name(filename):
     # split by underscore
     fname = [e.split('.') for e in filename.split('_')]
@@ -179,21 +374,184 @@ def _read_zls_format_file(filepath):
     # read into dataframe
     df = pd.read_fwf(filepath, widths=col_widths, names=col_names)
 
-    day_fmt = lambda x: '{:03d}'.format(x)
-    time_fmt = lambda x: '{:02d}'.format(x)
-
-    t = df['year'].map(str) + df['day'].map(day_fmt) + \
-        df['hour'].map(time_fmt) + df['minute'].map(time_fmt) + \
-        df['second'].map(time_fmt)
-
     # index by datetime
-    df.index = pd.to_datetime(t, format='%Y%j%H%M%S')
+    df.index = datetime_from_fields(df['year'].values,
+                                    day_of_year=df['day'].values,
+                                    hour=df['hour'].values,
+                                    minute=df['minute'].values,
+                                    second=df['second'].values)
     df.drop(time_columns, axis=1, inplace=True)
 
     return df
 
 
-def read_zls(dirpath, begin_time=None, end_time=None, excludes=['.*']):
+def _read_zls_format_files(paths, processes=1):
+    """ Parse ZLS files, in parallel if more than one process is requested """
+    if processes != 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            return list(executor.map(_read_zls_format_file, paths))
+    else:
+        return [_read_zls_format_file(path) for path in paths]
+
+
+ZLS_MANIFEST_NAME = '.zls_manifest.json'
+ZLS_CACHE_DIR = '.zls_cache'
+
+
+def _update_zls_manifest(dirpath, excludes, processes=1):
+    """
+    Load and update the manifest of a ZLS data directory.
+
+    The manifest is stored as JSON in the data directory, and records for
+    each hourly file its start time (from the file name), the first and last
+    time of the data, its size and modification time. The parsed data of each
+    file is cached alongside the manifest. Files that are new or have changed
+    since the manifest was written are parsed and cached, unchanged files are
+    not touched.
+
+    Parameters
+    ----------
+    dirpath : str
+        Filesystem path to directory containing files
+    excludes : str
+        Regular expression of files to exclude from the directory listing
+    processes : int or None
+        Number of worker processes used to parse new files
+
+    Returns
+    -------
+    dict
+        Manifest entries keyed by file name
+    """
+    manifest_path = os.path.join(dirpath, ZLS_MANIFEST_NAME)
+    cache_dir = os.path.join(dirpath, ZLS_CACHE_DIR)
+
+    try:
+        with open(manifest_path, 'r') as fd:
+            manifest = json.load(fd)
+    except (OSError, ValueError):
+        manifest = {}
+
+    current = {}
+    stale = []
+    for entry in os.scandir(dirpath):
+        if not entry.is_file() or re.match(excludes, entry.name):
+            continue
+        if entry.name in (ZLS_MANIFEST_NAME, ZLS_CACHE_DIR):
+            continue
+
+        stat = entry.stat()
+        record = manifest.get(entry.name)
+        cached = os.path.join(cache_dir, entry.name + '.pkl')
+        if (record is not None and record['size'] == stat.st_size
+                and record['mtime'] == stat.st_mtime_ns
+                and os.path.exists(cached)):
+            current[entry.name] = record
+        else:
+            current[entry.name] = {'start': _parse_zls_file_name(entry.name)
+                                   .isoformat(),
+                                   'size': stat.st_size,
+                                   'mtime': stat.st_mtime_ns}
+            stale.append(entry.name)
+
+    if stale:
+        os.makedirs(cache_dir, exist_ok=True)
+        paths = [os.path.join(dirpath, name) for name in stale]
+        for name, frame in zip(stale, _read_zls_format_files(paths, processes)):
+            frame.to_pickle(os.path.join(cache_dir, name + '.pkl'))
+            # files without data have no first and last times
+            if not frame.empty:
+                current[name]['first'] = frame.index[0].isoformat()
+                current[name]['last'] = frame.index[-1].isoformat()
+
+    # remove cached data of files which no longer exist
+    for name in set(manifest) - set(current):
+        try:
+            os.remove(os.path.join(cache_dir, name + '.pkl'))
+        except OSError:
+            pass
+
+    if stale or set(manifest) != set(current):
+        with open(manifest_path, 'w') as fd:
+            json.dump(current, fd, indent=1)
+
+    return current
+
+
+def _read_zls_manifest(dirpath, begin_time, end_time, excludes, processes):
+    """ Read ZLS data for the requested times using the directory manifest """
+    manifest = _update_zls_manifest(dirpath, excludes, processes)
+    starts = {pd.Timestamp(record['start']).to_pydatetime(): name
+              for name, record in manifest.items()}
+
+    files, begin_time, end_time = _select_zls_files(sorted(starts), begin_time,
+                                                    end_time)
+
+    frames = []
+    for start in files:
+        name = starts[start]
+        record = manifest[name]
+
+        # skip files without data or whose data does not overlap the
+        # requested times
+        if 'first' not in record:
+            continue
+        if (pd.Timestamp(record['last']) < begin_time
+                or pd.Timestamp(record['first']) > end_time):
+            continue
+
+        frames.append(pd.read_pickle(os.path.join(dirpath, ZLS_CACHE_DIR,
+                                                  name + '.pkl')))
+
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames)
+
+    return df.loc[(df.index >= begin_time) & (df.index <= end_time)]
+
+
+def _select_zls_files(files, begin_time, end_time):
+    """
+    Validate the begin and end times against the sorted start times of the
+    hourly ZLS files and select the files required to cover them.
+
+    Returns
+    -------
+    (files, begin_time, end_time)
+        Selected file start times, and the validated begin and end times
+    """
+    # validate begin and end times
+    if begin_time is None and end_time is None:
+        begin_time = files[0]
+        end_time = files[-1] + datetime.timedelta(hours=1)
+
+    elif begin_time is None and end_time is not None:
+        begin_time = files[0]
+        if end_time < begin_time or end_time > files[-1]:
+            raise ValueError('end time ({end}) is out of bounds'
+                             .format(end=end_time))
+
+    elif begin_time is not None and end_time is None:
+        end_time = files[-1]
+        if begin_time > end_time or begin_time < files[0]:
+            raise ValueError('begin time ({begin}) is out of bounds'
+                             .format(begin=begin_time))
+
+    else:
+        if begin_time > end_time:
+            raise ValueError('begin time ({begin}) is after end time ({end})'
+                             .format(begin=begin_time, end=end_time))
+
+    # filter file list based on begin and end times
+    files = list(filter(lambda x: (begin_time <= x <= end_time)
+                        or (begin_time - datetime.timedelta(hours=1) <= x <= begin_time)
+                        or (end_time - datetime.timedelta(hours=1) <= x <= end_time), files))
+
+    return files, begin_time, end_time
+
+
+def read_zls(dirpath, begin_time=None, end_time=None, excludes=['.*'],
+             processes=1, use_manifest=False):
     """
     Read and parse gravity data file from ZLS meter.
 
@@ -215,6 +573,14 @@ def read_zls(dirpath, begin_time=None, end_time=None, excludes=['.*']):
         Data end time if not importing to the last file in the directory
     excludes : list
         Files and directories to exclude from directory listing.
+    processes : int or None, default 1
+        Number of worker processes used to parse the hourly files. If None,
+        the number of processors on the machine is used.
+    use_manifest : bool, default False
+        Keep a manifest of the directory and a cache of the parsed files
+        alongside the data. Repeated reads then only parse files which are
+        new or have changed since the previous read. If the manifest cannot
+        be written, e.g. in a read-only directory, all files are parsed.
 
     Returns
     -------
@@ -224,6 +590,15 @@ def read_zls(dirpath, begin_time=None, end_time=None, excludes=['.*']):
 
     excludes = r'|'.join([fnmatch.translate(x) for x in excludes]) or r'$.'
 
+    if use_manifest:
+        try:
+            return _read_zls_manifest(dirpath, begin_time, end_time, excludes,
+                                      processes)
+        except OSError as e:
+            warnings.warn('Unable to use the ZLS manifest of {dir}, reading '
+                          'without it: {err}'.format(dir=dirpath, err=e),
+                          stacklevel=2)
+
     # list files in directory
     files = [_parse_zls_file_name(f) for f in os.listdir(dirpath)
              if os.path.isfile(os.path.join(dirpath, f))
@@ -232,45 +607,19 @@ def read_zls(dirpath, begin_time=None, end_time=None, excludes=['.*']):
     # sort files
     files = sorted(files)
 
-    # validate begin and end times
-    if begin_time is None and end_time is None:
-        begin_time = files[0]
-        end_time = files[-1] + datetime.timedelta(hours=1)
-
-    elif begin_time is None and end_time is not None:
-        begin_time = files[0]
-        if end_time < begin_time or end_time > files[-1]:
-            raise ValueError('end time ({end}) is out of bounds'
-                             .format(end=end_time))
-
-    elif begin_time is not None and end_time is None:
-        end_time = files[-1]
-        if begin_time > end_time or begin_time < files[0]:
-            raise ValueError('begin time ({begin}) is out of bounds'
-                             .format(begin=begin_time))
-
-    else:
-        if begin_time > end_time:
-            raise ValueError('begin time ({begin}) is after end time ({end})'
-                             .format(begin=begin_time, end=end_time))
-
-    # filter file list based on begin and end times
-    files = filter(lambda x: (begin_time <= x <= end_time)
-                             or (begin_time - datetime.timedelta(hours=1) <= x <= begin_time)
-                             or (end_time - datetime.timedelta(hours=1) <= x <= end_time), files)
+    files, begin_time, end_time = _select_zls_files(files, begin_time,
+                                                    end_time)
 
     # convert to ZLS-type file names
     files = [dt.strftime('%Y_%H.%j') for dt in files]
 
-    df = pd.DataFrame()
-    for f in files:
-        frame = _read_zls_format_file(os.path.join(dirpath, f))
-        df = pd.concat([df, frame])
+    paths = [os.path.join(dirpath, f) for f in files]
+    frames = _read_zls_format_files(paths, processes)
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames)
 
-    df.drop(df.index[df.index < begin_time], inplace=True)
-    df.drop(df.index[df.index > end_time], inplace=True)
-
-    return df
+    return df.loc[(df.index >= begin_time) & (df.index <= end_time)]
 
 
 FUNCTION_MAP = {'at1a': read_at1a, 'zls': read_zls}
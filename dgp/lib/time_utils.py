@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-import collections
+import collections.abc
 from functools import lru_cache
 
 leap_second_table = [(datetime(1980, 1, 1), datetime(1981, 7, 1)),
@@ -23,20 +24,95 @@ leap_second_table = [(datetime(1980, 1, 1), datetime(1981, 7, 1)),
                      (datetime(2015, 7, 1), datetime(2017, 1, 1))]
 
 
+# GPS time begins 1980 Jan 6 00:00, UNIX time begins 1970 Jan 1 00:00
+_GPS_EPOCH_NS = 315964800 * 10 ** 9
+_GPS_WEEK_NS = 604800 * 10 ** 9
+
+
+def gps_to_datetime64(gpsweek, gpsweekseconds):
+    """
+    Convert GPS weeks and seconds of week to datetime64[ns] exactly, without
+    correcting for UTC leap seconds.
+
+    The whole and fractional parts of the seconds are converted to integer
+    nanoseconds separately, so float seconds of week are resolved to the
+    nearest nanosecond rather than accumulating the error of a float
+    timestamp.
+
+    Parameters
+    ----------
+    gpsweek : array-like of int
+        Number of weeks since beginning of GPS time (1980-01-06 00:00:00)
+    gpsweekseconds : array-like of int or float
+        Number of seconds since the GPS week parameter
+
+    Returns
+    -------
+    :obj:`numpy.ndarray`
+        Array of datetime64[ns]. Missing weeks or seconds result in NaT.
+    """
+    weeks = np.asarray(gpsweek)
+    seconds = np.asarray(gpsweekseconds)
+    missing = np.zeros(np.broadcast(weeks, seconds).shape, dtype=bool)
+
+    if weeks.dtype.kind == 'f':
+        missing |= np.isnan(weeks)
+        weeks = np.where(missing, 0, weeks)
+    weeks = weeks.astype(np.int64)
+
+    if seconds.dtype.kind == 'f':
+        missing |= np.isnan(seconds)
+        seconds = np.where(np.isnan(seconds), 0, seconds)
+        whole = np.floor(seconds)
+        frac = np.rint((seconds - whole) * 1e9).astype(np.int64)
+        whole = whole.astype(np.int64)
+    else:
+        whole = seconds.astype(np.int64)
+        frac = 0
+
+    ticks = (_GPS_EPOCH_NS + weeks * _GPS_WEEK_NS + whole * 10 ** 9
+             + frac).astype(np.int64)
+    ticks[missing] = np.iinfo(np.int64).min
+    return ticks.view('datetime64[ns]')
+
+
+def datetime_to_gps(dt):
+    """
+    Vectorized conversion of datetimes to GPS weeks and seconds of week,
+    without correcting for UTC leap seconds.
+
+    Parameters
+    ----------
+    dt : :obj:`DatetimeIndex` or array-like of datetimes
+
+    Returns
+    -------
+    (:obj:`numpy.ndarray`, :obj:`numpy.ndarray`)
+        Integer GPS weeks and float seconds of week.
+    """
+    ticks = pd.DatetimeIndex(dt).asi8 - _GPS_EPOCH_NS
+    weeks = ticks // _GPS_WEEK_NS
+    seconds = (ticks - weeks * _GPS_WEEK_NS) / 1e9
+    return weeks, seconds
+
+
 def datetime_to_sow(dt):
-    def _to_sow(dt):
-        delta = dt - datetime(1980, 1, 6)
-        week = delta.days // 7
-        sow = (delta.days % 7) * 86400. + delta.seconds + delta.microseconds * 1e-6
-        return week, sow
-
-    if isinstance(dt, collections.Iterable):
-        res = []
-        for i in dt:
-            res.append(_to_sow(i))
-        return res
+    """
+    Convert a datetime, or an iterable of datetimes, to GPS week and seconds
+    of week.
+
+    Returns
+    -------
+    tuple or List[tuple]
+        (week, seconds of week) for a single datetime, or a list of them for
+        an iterable.
+    """
+    if isinstance(dt, collections.abc.Iterable):
+        weeks, seconds = datetime_to_gps(dt)
+        return list(zip(weeks.tolist(), seconds.tolist()))
     else:
-        return _to_sow(dt)
+        weeks, seconds = datetime_to_gps([dt])
+        return weeks[0].item(), seconds[0].item()
 
 
 def convert_gps_time(gpsweek, gpsweekseconds, format='unix'):
@@ -70,13 +146,25 @@ def convert_gps_time(gpsweek, gpsweekseconds, format='unix'):
     float or :obj:`datetime`
         UNIX timestamp (number of seconds since 1970-01-01 00:00:00) without
         leapseconds subtracted if 'unix' is specified for format.
-        Otherwise, a :obj:`datetime` is returned.
+        Otherwise, a :obj:`Timestamp` is returned, or a Series of
+        datetime64[ns] for Series input (see :func:`gps_to_datetime64`).
     """
     # GPS time begins 1980 Jan 6 00:00, UNIX time begins 1970 Jan 1 00:00
     gps_delta = 315964800.0
     gpsweek_cf = 604800
 
-    if isinstance(gpsweek, pd.Series) and isinstance(gpsweekseconds, pd.Series):
+    series = (isinstance(gpsweek, pd.Series) and
+              isinstance(gpsweekseconds, pd.Series))
+
+    if format == 'datetime':
+        if series:
+            return pd.Series(gps_to_datetime64(gpsweek.values,
+                                               gpsweekseconds.values),
+                             index=gpsweekseconds.index)
+        return pd.Timestamp(gps_to_datetime64([gpsweek],
+                                              [gpsweekseconds])[0])
+
+    if series:
         gps_ticks = (gpsweek.astype('float64') * gpsweek_cf) + gpsweekseconds.astype('float64')
     else:
         gps_ticks = (float(gpsweek) * gpsweek_cf) + float(gpsweekseconds)
@@ -86,8 +174,204 @@ def convert_gps_time(gpsweek, gpsweekseconds, format='unix'):
     if format == 'unix':
         return timestamp
 
-    elif format == 'datetime':
-        return datetime(1970, 1, 1) + pd.to_timedelta(timestamp * 1e9)
+
+def datetime_from_fields(year, month=None, day=None, day_of_year=None,
+                         hour=0, minute=0, second=0, nanosecond=0):
+    """
+    Assemble datetimes from split numeric date and time fields.
+
+    Timestamps are computed directly as int64 nanoseconds since the epoch
+    from the numeric fields, without formatting them as strings and parsing
+    them back. The date is given either as month and day of month, or as
+    day of year.
+
+    Parameters
+    ----------
+    year : array-like of int
+    month : array-like of int, optional
+        Month of year (1-12). Requires day.
+    day : array-like of int, optional
+        Day of month (1-31)
+    day_of_year : array-like of int, optional
+        Day of year (1-366). Used instead of month and day.
+    hour : array-like of int, optional
+    minute : array-like of int, optional
+    second : array-like of int or float, optional
+        Fractional seconds are rounded to the nearest nanosecond.
+    nanosecond : array-like of int, optional
+        Nanoseconds added to the time of day
+
+    Returns
+    -------
+    :obj:`DatetimeIndex`
+
+    Raises
+    ------
+    ValueError
+        If neither day_of_year, nor month and day are given.
+    """
+    years = np.asarray(year, dtype=np.int64) - 1970
+
+    if day_of_year is not None:
+        start = years.astype('datetime64[Y]').astype('datetime64[D]')
+        days = start.astype(np.int64) + np.asarray(day_of_year, dtype=np.int64) - 1
+    elif month is not None and day is not None:
+        months = years * 12 + np.asarray(month, dtype=np.int64) - 1
+        start = months.astype('datetime64[M]').astype('datetime64[D]')
+        days = start.astype(np.int64) + np.asarray(day, dtype=np.int64) - 1
+    else:
+        raise ValueError('Either day_of_year, or month and day must be given')
+
+    second = np.asarray(second)
+    if second.dtype.kind == 'f':
+        second_ns = np.round(second * 1e9).astype(np.int64)
+    else:
+        second_ns = second.astype(np.int64) * 10**9
+
+    ns = (days * 86400 * 10**9
+          + np.asarray(hour, dtype=np.int64) * 3600 * 10**9
+          + np.asarray(minute, dtype=np.int64) * 60 * 10**9
+          + second_ns
+          + np.asarray(nanosecond, dtype=np.int64))
+
+    return pd.DatetimeIndex(np.atleast_1d(ns).astype('datetime64[ns]'))
+
+
+def _parse_digit_fields(strings, separators, fraction=False):
+    """
+    Split fixed-layout strings of digit fields into integer arrays.
+
+    Rows are grouped by length, and within a group all rows with the same
+    layout (positions of the separators) as the first row are converted
+    together, by arithmetic on the character codes. At most a few layouts are
+    tried per group; rows with any other layout are left for the caller.
+
+    Parameters
+    ----------
+    strings : numpy.array of bytes
+    separators : bytes
+        Expected separator characters, in order
+    fraction : bool
+        The last field may be a decimal fraction, separated by '.', which is
+        returned in nanoseconds.
+
+    Returns
+    -------
+    (list of numpy.array, numpy.array)
+        One int64 array per field (plus the fraction if fraction is True),
+        and the boolean mask of the rows parsed.
+    """
+    nfields = len(separators) + 1
+    fields = [np.zeros(len(strings), dtype=np.int64)
+              for _ in range(nfields + int(fraction))]
+    parsed = np.zeros(len(strings), dtype=np.bool_)
+
+    if len(strings) == 0:
+        return fields, parsed
+
+    lengths = np.char.str_len(strings)
+    buffer = strings.view(np.uint8).reshape(len(strings), -1)
+
+    for length in np.unique(lengths):
+        group = np.flatnonzero(lengths == length)
+        for _ in range(4):
+            chars = buffer[group, :length]
+            digits = (chars >= ord('0')) & (chars <= ord('9'))
+
+            pattern = np.flatnonzero(~digits[0])
+            layout = chars[0, pattern].tobytes()
+            same = ((digits == digits[0]).all(axis=1)
+                    & (chars[:, pattern] == chars[0, pattern]).all(axis=1))
+
+            # a fractional field is optional
+            expected = layout == separators
+            if fraction and not expected:
+                expected = layout == separators + b'.'
+
+            bounds = np.concatenate([[-1], pattern, [length]])
+            if expected and np.all(np.diff(bounds) > 1):
+                rows = group[same]
+                for i, (begin, end) in enumerate(zip(bounds[:-1] + 1, bounds[1:])):
+                    value = np.zeros(len(rows), dtype=np.int64)
+                    if i == nfields:
+                        # digits of the fraction beyond nanoseconds are dropped
+                        end = min(end, begin + 9)
+                    for col in range(begin, end):
+                        value = value * 10 + (chars[same, col] - ord('0'))
+                    if i == nfields:
+                        value *= 10 ** (9 - (end - begin))
+                    fields[i][rows] = value
+                parsed[rows] = True
+
+            group = group[~same]
+            if len(group) == 0:
+                break
+
+    return fields, parsed
+
+
+def parse_mdy_hms(mdy, hms):
+    """
+    Parse split date and time string columns to datetimes.
+
+    Dates in the format 'MM/DD/YYYY' and times in the format 'HH:MM:SS.SSS'
+    (as exported by Waypoint) are converted without per-element string
+    parsing: the characters are decoded with vectorized arithmetic to numeric
+    fields, which are assembled into int64 nanoseconds. Fields need not be
+    zero-padded, and the number of fractional second digits may vary.
+    Only rows which do not fit the layout are parsed with the generic
+    :func:`pandas.to_datetime`.
+
+    Parameters
+    ----------
+    mdy : pandas.Series of str
+        Dates in the format 'MM/DD/YYYY'
+    hms : pandas.Series of str
+        Times in the format 'HH:MM:SS.SSS'
+
+    Returns
+    -------
+    :obj:`DatetimeIndex`
+    """
+    mdy = pd.Series(mdy)
+    hms = pd.Series(hms)
+    try:
+        dates = np.char.strip(mdy.values.astype(np.bytes_))
+        times = np.char.strip(hms.values.astype(np.bytes_))
+    except (UnicodeEncodeError, ValueError, TypeError):
+        dates = times = np.array([], dtype=np.bytes_)
+
+    if len(dates) != len(mdy):
+        return pd.DatetimeIndex(pd.to_datetime(mdy.str.strip() + hms.str.strip(),
+                                               format="%m/%d/%Y%H:%M:%S.%f"))
+
+    (month, day, year), date_parsed = _parse_digit_fields(dates, b'//')
+    time_fields, time_parsed = _parse_digit_fields(times, b'::', fraction=True)
+    hour, minute, second, nanosecond = time_fields
+
+    months = (year - 1970) * 12 + month - 1
+    month_days = ((months + 1).astype('datetime64[M]').astype('datetime64[D]')
+                  - months.astype('datetime64[M]').astype('datetime64[D]'))
+
+    parsed = (date_parsed & time_parsed
+              & (month >= 1) & (month <= 12)
+              & (day >= 1) & (day <= month_days.astype(np.int64))
+              & (hour < 24) & (minute < 60) & (second < 61))
+
+    ns = datetime_from_fields(year, month=month, day=day, hour=hour,
+                              minute=minute, second=second,
+                              nanosecond=nanosecond).asi8
+
+    # generic parsing of rows not matching the layout
+    if not parsed.all():
+        rows = ~parsed
+        irregular = pd.to_datetime(mdy[rows].str.strip() + hms[rows].str.strip(),
+                                   format="%m/%d/%Y%H:%M:%S.%f")
+        ns = ns.copy()
+        ns[rows] = pd.DatetimeIndex(irregular).asi8
+
+    return pd.DatetimeIndex(ns.astype('datetime64[ns]'))
+
 
 def leap_seconds(**kwargs):
     """
@@ -159,12 +443,69 @@ def _get_leap_seconds(dt):
     return ls
 
 
+# dates at which each leap second in the table took effect, as int64 ns
+_LEAP_SECOND_TICKS = np.array([entry[1] for entry in leap_second_table],
+                              dtype='datetime64[ns]').astype(np.int64)
+
+
+def leap_seconds_array(index):
+    """
+    Vectorized look-up for the number of leap seconds at each timestamp
+
+    Parameters
+    ----------
+    index : :obj:`DatetimeIndex` or array-like of datetimes
+        Timestamps to look up. Timezone-aware values are compared in UTC.
+
+    Returns
+    -------
+    :obj:`numpy.ndarray`
+        Integer array of accumulated leap seconds as of each timestamp, the
+        same as calling :func:`leap_seconds` for every element.
+    """
+    ticks = pd.DatetimeIndex(index).asi8
+    return np.searchsorted(_LEAP_SECOND_TICKS, ticks, side='right')
+
+
+# MATLAB serial date number of 1970-01-01 00:00:00
+_DATENUM_UNIX_EPOCH = 719529
+
+
 def datenum_to_datetime(timestamp):
-    raise NotImplementedError
-    # if isinstance(timestamp, pd.Series):
-    #     return (timestamp.astype(int).map(datetime.fromordinal) +
-    #             pd.to_timedelta(timestamp % 1, unit='D') -
-    #             pd.to_timedelta('366 days'))
-    # else:
-    #     return (datetime.fromordinal(int(timestamp) - 366) +
-    #             timedelta(days=timestamp % 1))
+    """
+    Convert MATLAB serial date numbers to datetimes.
+
+    A serial date number is the number of days (with fractional part) since
+    the year 0000-01-00. The whole and fractional days are converted
+    separately to int64 nanoseconds, so the conversion keeps the full
+    resolution of the input (about 10 microseconds for present day dates)
+    and is vectorized over arrays.
+
+    Parameters
+    ----------
+    timestamp : float, array-like or pandas.Series
+        MATLAB serial date number(s)
+
+    Returns
+    -------
+    :obj:`Timestamp`, :obj:`DatetimeIndex` or pandas.Series
+        A Series (with the same index) is returned for a Series input, a
+        DatetimeIndex for other array-like inputs and a Timestamp for scalars.
+        Missing (non-finite) date numbers result in NaT.
+    """
+    values = np.asarray(timestamp, dtype=np.float64)
+    missing = ~np.isfinite(values)
+    values = np.where(missing, _DATENUM_UNIX_EPOCH, values)
+
+    days = np.floor(values)
+    fraction = values - days
+    ns = ((days.astype(np.int64) - _DATENUM_UNIX_EPOCH) * 86400 * 10**9
+          + np.round(fraction * 86400 * 10**9).astype(np.int64))
+    ns = np.where(missing, np.iinfo(np.int64).min, ns)
+    dt = ns.astype('datetime64[ns]')
+
+    if isinstance(timestamp, pd.Series):
+        return pd.Series(dt, index=timestamp.index, name=timestamp.name)
+    elif np.ndim(timestamp) == 0:
+        return pd.Timestamp(dt[()])
+    return pd.DatetimeIndex(dt)
@@ -1,11 +1,16 @@
 # coding=utf-8
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 from pandas import DataFrame
 import pandas as pd
 from pandas.tseries.frequencies import to_offset
 from pandas.tseries.offsets import DateOffset
-from scipy.interpolate import interp1d
+from scipy.fftpack import next_fast_len
+from scipy.interpolate import CubicSpline
+from scipy.signal import resample_poly
 import warnings
 
 
@@ -27,22 +32,109 @@ def interpolate_1d_vector(vector: np.array, factor: int):
 
     """
     x = np.arange(np.size(vector))
-    y = vector
-    f = interp1d(x, y)
-    # f = np.interp(x, x, y)
-
     x_extended_by_factor = np.linspace(x[0], x[-1], np.size(x) * factor)
-    y_interpolated = np.zeros(np.size(x_extended_by_factor))
+    return np.interp(x_extended_by_factor, x, vector)
+
 
-    i = 0
-    for x in x_extended_by_factor:
-        y_interpolated[i] = f(x)
-        i += 1
+def oversample(vector: np.array, factor: int, method: str='linear'):
+    """
+    Oversample a 1D vector onto a grid 'factor' times as dense
 
-    return y_interpolated
+    Unlike :func:`interpolate_1d_vector`, the output samples are exactly
+    1/factor samples apart, so lags of the oversampled vector convert to
+    time at 'factor' times the input data rate.
 
+    Parameters
+    ----------
+    vector: np.array
+        1D Data Vector
+    factor: int
+        Oversampling factor
+    method: str
+        'linear' | 'polyphase'
+        'linear' interpolates linearly between samples. 'polyphase' applies
+        a polyphase (band-limited) FIR interpolation filter.
 
-def find_time_delay(s1, s2, datarate=1, resolution: bool=False):
+    Returns
+    -------
+    np.array:
+        1D Array of length (N - 1) * factor + 1
+
+    """
+    vector = np.asarray(vector, dtype=np.float64)
+    n = np.size(vector)
+    if method == 'linear':
+        x = np.arange((n - 1) * factor + 1) / factor
+        return np.interp(x, np.arange(n), vector)
+    elif method == 'polyphase':
+        return resample_poly(vector, factor, 1)[:(n - 1) * factor + 1]
+    else:
+        raise ValueError('Unknown oversampling method {!r}'.format(method))
+
+
+def correlate_lags(in1, in2, maxlag: int, method: str='auto'):
+    """
+    Cross-correlate two signals for lags from -maxlag to maxlag only
+
+    Equivalent to the window of np.correlate(in1, in2, mode='full') centered
+    on zero lag, i.e. for each lag k the sum of in1[n + k] * in2[n].
+
+    Parameters
+    ----------
+    in1: np.array
+    in2: np.array
+    maxlag: int
+        Largest lag, in samples, to compute
+    method: str
+        'auto' | 'direct' | 'fft'
+        'direct' computes a dot product for each lag, which is fastest for a
+        narrow lag window. 'fft' computes all lags through the FFT in
+        O(N log N). 'auto' chooses between the two from the sizes.
+
+    Returns
+    -------
+    np.array:
+        Correlation for each lag, of length 2 * maxlag + 1
+
+    """
+    in1 = np.asarray(in1, dtype=np.float64)
+    in2 = np.asarray(in2, dtype=np.float64)
+    n1, n2 = len(in1), len(in2)
+    nlags = 2 * maxlag + 1
+
+    if method == 'auto':
+        # a dot product per lag is cheaper until the lag window becomes wide
+        # relative to the log of the transform length
+        nfft = next_fast_len(n1 + n2 - 1)
+        method = 'direct' if nlags <= 40 * np.log2(nfft) else 'fft'
+
+    if method == 'direct':
+        corr = np.zeros(nlags)
+        for i, lag in enumerate(range(-maxlag, maxlag + 1)):
+            start1, start2 = max(lag, 0), max(-lag, 0)
+            length = min(n1 - start1, n2 - start2)
+            if length > 0:
+                corr[i] = np.dot(in1[start1:start1 + length],
+                                 in2[start2:start2 + length])
+        return corr
+
+    elif method == 'fft':
+        nfft = next_fast_len(n1 + n2 - 1)
+        circular = np.fft.irfft(np.fft.rfft(in1, nfft) *
+                                np.conj(np.fft.rfft(in2, nfft)), nfft)
+        lags = np.arange(-maxlag, maxlag + 1)
+        corr = circular[lags % nfft]
+        # lags beyond the overlap of the signals are zero
+        corr[(lags >= n1) | (lags <= -n2)] = 0
+        return corr
+
+    else:
+        raise ValueError('Unknown correlation method {!r}'.format(method))
+
+
+def find_time_delay(s1, s2, datarate=1, resolution: bool=False,
+                    method: str='auto', factor: int=10,
+                    oversampling: str='linear'):
     """
     Finds the time shift or delay between two signals
     If s1 is advanced to s2, then the delay is positive.
@@ -56,7 +148,16 @@ def find_time_delay(s1, s2, datarate=1, resolution: bool=False):
         given in the first two arguments, then this argument is ignored.
     resolution: bool
         If False use data without oversampling
-        If True, calculates time delay with 10* oversampling
+        If True, calculates time delay with 'factor' times oversampling
+    method: str
+        'auto' | 'direct' | 'fft'
+        Cross-correlation engine, see :func:`correlate_lags`. Default: 'auto'
+    factor: int
+        Oversampling factor used if resolution is True. Default: 10
+    oversampling: str
+        'linear' | 'polyphase'
+        Oversampling method used if resolution is True, see
+        :func:`oversample`. Default: 'linear'
 
     Returns
     -------
@@ -125,19 +226,18 @@ def find_time_delay(s1, s2, datarate=1, resolution: bool=False):
         in2 = s2
 
     lagwith = 200
-    len_s1 = len(in1)
 
     if not resolution:
-        c = np.correlate(in1, in2, mode='full')
         scale = datarate
     else:
-        in1 = interpolate_1d_vector(in1, datarate)
-        in2 = interpolate_1d_vector(in2, datarate)
-        c = np.correlate(in1, in2, mode='full')
-        scale = datarate * 10
+        in1 = oversample(in1, factor, oversampling)
+        in2 = oversample(in2, factor, oversampling)
+        scale = datarate * factor
+        # search the same span of time at the finer sampling
+        lagwith *= factor
 
     shift = np.linspace(-lagwith, lagwith, 2 * lagwith + 1)
-    corre = c[len_s1 - 1 - lagwith:len_s1 + lagwith]
+    corre = correlate_lags(in1, in2, lagwith, method=method)
     maxi = np.argmax(corre)
     dm1 = abs(corre[maxi] - corre[maxi - 1])
     dp1 = abs(corre[maxi] - corre[maxi + 1])
@@ -152,12 +252,270 @@ def find_time_delay(s1, s2, datarate=1, resolution: bool=False):
     return dt1 / scale
 
 
+def _window_delay(in1, in2, datarate=1, **kwargs):
+    """ Time delay of one window, NaN if it can't be estimated """
+    if (len(in1) == 0 or len(in2) == 0 or not np.all(np.isfinite(in1))
+            or not np.all(np.isfinite(in2))):
+        return np.nan
+    try:
+        return find_time_delay(in1, in2, datarate, **kwargs)
+    except (ValueError, IndexError, TypeError, np.linalg.LinAlgError):
+        return np.nan
+
+
+def find_time_delays(s1, s2, datarate=1, window=600, step=None,
+                     processes=None, **kwargs):
+    """
+    Finds the time-varying delay between two signals over sliding windows
+
+    The delay is estimated with :func:`find_time_delay` over windows of
+    'window' seconds, starting every 'step' seconds. The windows are
+    processed in parallel.
+
+    Parameters
+    ----------
+    s1: array-like
+    s2: array-like
+    datarate: int, optional
+        Input data sample rate in Hz. If both inputs have a DatetimeIndex, the
+        rate is inferred from the index of s1 where possible, and the windows
+        are taken over the time span common to both.
+    window: float
+        Length of each window in seconds. Default: 600
+    step: float, optional
+        Time between the start of consecutive windows in seconds. Default is
+        half the window length, i.e. windows overlap by half.
+    processes: int or None
+        Number of worker processes. If None, the number of processors on the
+        machine. Default: None
+    **kwargs
+        Further options for :func:`find_time_delay`, e.g. resolution, method
+
+    Returns
+    -------
+    Series:
+        Delay in seconds for each window (NaN where it can't be estimated),
+        indexed by the center time of the window. The index is a
+        DatetimeIndex if both inputs have one, otherwise seconds since the
+        first sample.
+
+    """
+    if step is None:
+        step = window / 2
+
+    timed = (isinstance(getattr(s1, 'index', None), pd.DatetimeIndex) and
+             isinstance(getattr(s2, 'index', None), pd.DatetimeIndex))
+
+    if timed:
+        freq = s1.index.freq
+        if freq is None:
+            freq = s1.index.inferred_freq
+        if freq is not None:
+            datarate = 1 / pd.to_timedelta(to_offset(freq)).total_seconds()
+
+        length = pd.Timedelta(seconds=window)
+        start = max(s1.index[0], s2.index[0])
+        # end of the last sample period
+        end = (min(s1.index[-1], s2.index[-1]) +
+               pd.Timedelta(seconds=1 / datarate))
+        if end - start >= length:
+            starts = pd.date_range(start, end - length,
+                                   freq=pd.Timedelta(seconds=step))
+        else:
+            starts = pd.DatetimeIndex([start])
+
+        segments1, segments2 = [], []
+        for series, segments in ((s1, segments1), (s2, segments2)):
+            lo = series.index.searchsorted(starts)
+            hi = series.index.searchsorted(starts + length)
+            values = series.values
+            segments.extend(values[i:j] for i, j in zip(lo, hi))
+        centers = starts + length / 2
+    else:
+        in1 = np.asarray(s1)
+        in2 = np.asarray(s2)
+        n = min(len(in1), len(in2))
+        width = min(int(round(window * datarate)), n)
+        stride = max(int(round(step * datarate)), 1)
+        starts = np.arange(0, n - width + 1, stride)
+        segments1 = [in1[i:i + width] for i in starts]
+        segments2 = [in2[i:i + width] for i in starts]
+        centers = (starts + width / 2) / datarate
+
+    worker = partial(_window_delay, datarate=datarate, **kwargs)
+    if processes != 1 and len(segments1) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            delays = list(executor.map(worker, segments1, segments2))
+    else:
+        delays = [worker(in1, in2) for in1, in2 in zip(segments1, segments2)]
+
+    return pd.Series(delays, index=centers, name='delay')
+
+
 def shift_frame(frame, delay):
     return frame.tshift(delay * 1e6, freq='U')
 
 
+def _sinc_interpolate(y: np.array, positions: np.array, halfwidth: int=8,
+                      chunksize: int=65536):
+    """
+    Evaluate uniformly sampled data at fractional sample positions with a
+    Hann windowed-sinc kernel of 2 * halfwidth taps. Positions without a full
+    set of taps, or with a NaN among them, are NaN.
+    """
+    n = len(y)
+    result = np.full(len(positions), np.nan)
+    taps = np.arange(-halfwidth + 1, halfwidth + 1)
+    for start in range(0, len(positions), chunksize):
+        pos = positions[start:start + chunksize]
+        valid = ((pos >= halfwidth - 1) & (pos < n - halfwidth) &
+                 np.isfinite(pos))
+        pos = pos[valid]
+        k = np.floor(pos).astype(np.int64)[:, np.newaxis] + taps
+        offset = pos[:, np.newaxis] - k
+        weights = np.sinc(offset) * (0.5 + 0.5 * np.cos(np.pi * offset /
+                                                        halfwidth))
+        chunk = result[start:start + chunksize]
+        chunk[valid] = np.sum(y[k] * weights, axis=1)
+    return result
+
+
+def _gap_mask(finite: np.array, x: np.array, xq: np.array, reach: int):
+    """
+    Mask of the positions xq whose neighbouring samples, the reach samples on
+    either side, include a missing sample. Positions coinciding with a sample
+    only depend on that sample.
+    """
+    # number of missing samples before each sample, to count them in a window
+    missing = np.concatenate([[0], np.cumsum(~finite)])
+    n = len(x)
+    j = np.searchsorted(x, xq, side='right') - 1
+    exact = (j >= 0) & (x[np.clip(j, 0, n - 1)] == xq)
+    lo = np.clip(np.where(exact, j, j - reach + 1), 0, n)
+    hi = np.clip(np.where(exact, j + 1, j + reach + 1), 0, n)
+    return missing[hi] > missing[lo]
+
+
+def fractional_shift(frame, delay, index=None, method: str='cubic',
+                     nearest=()):
+    """
+    Shift a time series by a (fractional) delay by evaluating it directly at
+    the target timestamps, without upsampling.
+
+    The result at each target time t is the input data interpolated at
+    t - delay, i.e. the data is moved forward in time by a positive delay as
+    with :func:`shift_frame`. Memory use is proportional to the size of the
+    input and output.
+
+    Parameters
+    ----------
+    frame: Series or DataFrame
+        Data with a DatetimeIndex to shift
+    delay: float or array-like
+        Delay in seconds, either a scalar or one value per target timestamp
+    index: DatetimeIndex, optional
+        Target timestamps. Default is the index of frame
+    method: str
+        'linear' | 'cubic' | 'sinc'
+        Fractional-delay interpolator. 'sinc' is a windowed-sinc filter and
+        requires regularly sampled input. Default: 'cubic'
+    nearest: Iterable[str], optional
+        Float columns which take the nearest sample instead of being
+        interpolated, e.g. integer status words stored as float because of
+        missing samples
+
+    Returns
+    -------
+    Series or DataFrame:
+        Shifted data on the target index. Float columns are interpolated,
+        other columns (e.g. integer status words) take the nearest sample.
+        Times outside the data, or next to a missing (NaN) sample, are NaN in
+        the float columns.
+
+    """
+    if index is None:
+        index = frame.index
+    is_series = isinstance(frame, pd.Series)
+    data = frame.to_frame() if is_series else frame
+
+    t0 = frame.index.asi8[0]
+    x = (frame.index.asi8 - t0) * 1e-9
+    xq = (pd.DatetimeIndex(index).asi8 - t0) * 1e-9 - np.asarray(delay)
+
+    result = DataFrame(index=index)
+    for col in data.columns:
+        y = data[col].values
+        if y.dtype.kind != 'f' or col in nearest:
+            samples = np.rint(np.interp(xq, x, np.arange(len(x)))).astype(int)
+            result[col] = y[samples]
+        elif method == 'sinc':
+            interval = np.median(np.diff(x))
+            result[col] = _sinc_interpolate(y.astype(np.float64),
+                                            xq / interval)
+        elif method in ('linear', 'cubic'):
+            finite = np.isfinite(y)
+            if method == 'linear':
+                values = np.interp(xq, x[finite], y[finite], left=np.nan,
+                                   right=np.nan)
+            else:
+                spline = CubicSpline(x[finite], y[finite], extrapolate=False)
+                values = spline(xq)
+            # do not interpolate across gaps
+            if not finite.all():
+                reach = 1 if method == 'linear' else 2
+                values[_gap_mask(finite, x, xq, reach)] = np.nan
+            result[col] = values
+        else:
+            raise ValueError('Unknown interpolation method {!r}'
+                             .format(method))
+
+    return result[data.columns[0]].rename(frame.name) if is_series else result
+
+
+def shift_frame_varying(frame, delays, method: str='cubic', nearest=()):
+    """
+    Shift a time series by a time-varying delay
+
+    The delays, e.g. from :func:`find_time_delays`, are linearly interpolated
+    to every sample of the frame (and held constant beyond the first and last
+    estimates), and the frame is shifted in one pass with
+    :func:`fractional_shift`.
+
+    Parameters
+    ----------
+    frame: Series or DataFrame
+        Data with a DatetimeIndex to shift
+    delays: Series
+        Delays in seconds, indexed by time, or by seconds since the first
+        sample of frame. NaN delays are ignored.
+    method: str
+        'linear' | 'cubic' | 'sinc'
+        Fractional-delay interpolator. Default: 'cubic'
+    nearest: Iterable[str], optional
+        Float columns which take the nearest sample, see
+        :func:`fractional_shift`
+
+    Returns
+    -------
+    Series or DataFrame:
+        Shifted data on the index of frame
+
+    """
+    delays = delays.dropna()
+    if len(delays) == 0:
+        raise ValueError('No valid delays to apply')
+
+    ticks = frame.index.asi8
+    if isinstance(delays.index, pd.DatetimeIndex):
+        x = delays.index.asi8
+    else:
+        x = ticks[0] + np.asarray(delays.index, dtype=np.float64) * 1e9
+    delay = np.interp(ticks, x, delays.values)
+    return fractional_shift(frame, delay, method=method, nearest=nearest)
+
+
 def shift_frames(gravity: DataFrame, gps: DataFrame, eotvos: DataFrame,
-                 datarate=10) -> DataFrame:
+                 datarate=10, method: str='upsample') -> DataFrame:
     """
     Synchronize and join a gravity and gps DataFrame (DF) into a single time
     shifted DF.
@@ -181,6 +539,13 @@ def shift_frames(gravity: DataFrame, gps: DataFrame, eotvos: DataFrame,
         Eotvos correction for input Trajectory
     datarate: int
         Scalar datarate in Hz
+    method: str
+        'upsample' | 'linear' | 'cubic' | 'sinc'
+        'upsample' shifts the frames upsampled to 1ms as described above.
+        The other methods instead evaluate the gravity data directly at the
+        shifted timestamps of its own index with :func:`fractional_shift`,
+        and join the GPS data interpolated onto the same index, which
+        avoids materializing the 1ms frames. Default: 'upsample'
 
     Returns
     -------
@@ -195,6 +560,16 @@ def shift_frames(gravity: DataFrame, gps: DataFrame, eotvos: DataFrame,
     # eotvos = calc_eotvos(gps['lat'].values, gps['longitude'].values,
     #                      gps['ell_ht'].values, datarate)
     delay = find_time_delay(gravity['gravity'].values, eotvos, 10)
+
+    if method != 'upsample':
+        gravity_synced = fractional_shift(gravity, delay, method=method)
+        if gps.index.equals(gravity.index):
+            gps_synced = gps
+        else:
+            gps_synced = fractional_shift(gps, 0, index=gravity.index,
+                                          method=method)
+        return gravity_synced.join(gps_synced, how='left', rsuffix='_gps')
+
     time_shift = DateOffset(seconds=delay)
 
     # Upsample and then shift:
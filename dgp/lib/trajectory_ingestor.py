@@ -5,19 +5,81 @@ trajectory_ingestor.py
 Library for trajectory data import functions
 
 """
+import json
+import os
+import pickle
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 import pandas as pd
-from pandas.tseries.offsets import Milli
+from pandas.tseries.offsets import Micro
 
-from .time_utils import leap_seconds, convert_gps_time, datenum_to_datetime
+from .dtype_profiles import apply_dtype_profile
+from .etc import find_gaps
+from .time_utils import (leap_seconds_array, convert_gps_time,
+                         datenum_to_datetime, parse_mdy_hms)
 
 
 TRAJECTORY_INTERP_FIELDS = {'lat', 'long', 'ell_ht'}
 
+# Version of the frames produced by the ingestors of this module, increment
+# whenever they change so that stale entries of the ImportCache are not used
+CACHE_VERSION = 1
+
+# regular expression separators equivalent to splitting on whitespace
+WHITESPACE_SEPS = {r'\s+', r'[\s]+', r'[ \t]+'}
+
+
+def _line_sep(line):
+    """
+    Detect the delimiter of a single line of a trajectory file.
+
+    Returns a comma or a tab if the fields are delimited by commas or single
+    tabs respectively, otherwise the separator for any whitespace.
+    """
+    line = line.strip()
+    if ',' in line:
+        return ','
+    elif '\t' in line and '\t\t' not in line and ' ' not in line:
+        return '\t'
+    return r'\s+'
+
+
+def _detect_sep(filepath, skiprows=None):
+    """
+    Detect the delimiter of a trajectory file from its first data line.
+    """
+    skip = skiprows if isinstance(skiprows, int) else 0
+    with open(filepath, 'r') as fd:
+        for _ in range(skip):
+            fd.readline()
+        line = fd.readline()
+
+    return _line_sep(line)
+
+
+def _read_csv_options(delim_whitespace, engine, sep):
+    """
+    Choose the read_csv options for a delimiter.
+
+    Whitespace delimited files are read by the C parser with
+    delim_whitespace, instead of the (much slower) Python parser which
+    pandas requires for regular expression separators.
+    """
+    if delim_whitespace or sep in WHITESPACE_SEPS:
+        return {'delim_whitespace': True, 'engine': 'c'}
+    elif sep is not None and len(sep) == 1:
+        return {'sep': sep, 'engine': 'c'}
+    return {'sep': sep, 'engine': engine}
+
 
 def import_trajectory(filepath, delim_whitespace=False, interval=0,
                       interp=False, is_utc=False, columns=None, skiprows=None,
-                      timeformat='sow', engine='c', sep=','):
+                      timeformat='sow', engine='c', sep=',', gaps=False,
+                      dtype_profile=None, memory_map=False):
     """
     Read and parse ASCII trajectory data in a comma-delimited format.
 
@@ -26,6 +88,7 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
     filepath : str or File-like object.
         Filesystem path to trajectory data file
     delim_whitespace : bool
+        Fields are delimited by any whitespace, equivalent to sep='\\s+'
     interval : float, Optional
         Output data rate. Default behavior is to infer the rate.
     interp : Union[List[str], List[int]], Optional
@@ -33,8 +96,11 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
         column indices (list of ints) or list of column names (list of strs)
         to interpolate. Default behavior is not to interpolate.
     is_utc : bool, Optional
-        Indicates that the timestamps are UTC. The index datetimes will be
-        shifted to remove the GPS-UTC leap second offset.
+        Indicates that the timestamps are UTC. Each index datetime will be
+        shifted to remove the GPS-UTC leap second offset in effect at that
+        time. If a leap second was inserted during the survey, the second of
+        samples following it falls on the second preceding it, and is dropped
+        with a warning.
     columns : List[str]
         Strings to use as the column names.
         If none supplied (default), columns will be determined based on
@@ -51,26 +117,54 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
         named 'week' with the GPS week, and a field named 'sow' with the GPS
         seconds of week. The 'hms' format requires a field named 'mdy' with the
         date in the format 'MM/DD/YYYY', and a field named 'hms' with the time
-        in the format 'HH:MM:SS.SSS'. The 'serial' format (not yet implemented)
-        requires a field named 'datenum' with the serial date number.
+        in the format 'HH:MM:SS.SSS'. The 'serial' format requires a field
+        named 'datenum' with the MATLAB serial date number.
     engine : str
         'c' | 'python'  Default: 'c'
         Interpreter for Pandas read_csv. Waypoint, the default trajectory,
-        uses standard Pandas default of 'c'.
-    sep : str
-        ',' | '\t'  Default: ','
+        uses standard Pandas default of 'c'. The faster 'c' engine is always
+        used for single character and whitespace delimiters.
+    sep : str or None
+        ',' | '\t' | '\\s+' | None  Default: ','
         Delimiter for Pandas read_csv. Waypoint, the default trajectory,
         uses standard Pandas default of ',', but others, such as TerraPOS is
-        tab delimited, requiring '\t'.
+        whitespace delimited, requiring '\\s+'. If None, the delimiter is
+        detected from the first line of data.
+    gaps : bool, Optional
+        Do not fill time gaps with NaNs. Instead, only the observed samples
+        are kept and a gap table (see :func:`~dgp.lib.etc.find_gaps`) is
+        returned along with the data. Default: False
+    dtype_profile : str or dict, Optional
+        Name of a dtype profile (e.g. 'trajectory_compact', see
+        :mod:`~dgp.lib.dtype_profiles`) or mapping of column names to dtypes,
+        used to store the data compactly.
+    memory_map : bool, Optional
+        Map the file directly into memory and read the data from there.
+        Default: False
 
     Returns
     -------
     DataFrame
         Pandas DataFrame of ingested Trajectory data.
+    (DataFrame, DataFrame)
+        Trajectory data and the gap table, if gaps is True.
 
     """
-    df = pd.read_csv(filepath, delim_whitespace=delim_whitespace, header=None,
-                     engine=engine, na_filter=False, skiprows=skiprows, sep=sep)
+    df = _parse_trajectory(filepath, delim_whitespace, is_utc, columns,
+                           skiprows, timeformat, engine, sep, memory_map)
+    return _regularize_trajectory(df, interval, interp, gaps, dtype_profile)
+
+
+def _parse_trajectory(filepath, delim_whitespace=False, is_utc=False,
+                      columns=None, skiprows=None, timeformat='sow',
+                      engine='c', sep=',', memory_map=False):
+    """ Parse the observed samples of a trajectory file, without gap fill """
+    if sep is None and not delim_whitespace and isinstance(filepath, str):
+        sep = _detect_sep(filepath, skiprows)
+
+    options = _read_csv_options(delim_whitespace, engine, sep)
+    df = pd.read_csv(filepath, header=None, na_filter=False,
+                     skiprows=skiprows, memory_map=memory_map, **options)
 
     # assumed position of these required fields
     if columns is None:
@@ -87,7 +181,7 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
     # 'None' indicates a not-needed field
     # if a field is after all non-essentials, and is not named, it will be removed
     if len(df.columns) > len(columns):
-            columns.extend([None] * (len(df.columns) - len(columns)))
+        columns = list(columns) + [None] * (len(df.columns) - len(columns))
 
     # drop unwanted columns
     drop_list = list()
@@ -105,22 +199,44 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
     # create index
     if timeformat == 'sow':
         df.index = convert_gps_time(df['week'], df['sow'], format='datetime')
-        df.index = df.index.round(Milli())
         df.drop(['sow', 'week'], axis=1, inplace=True)
     elif timeformat == 'hms':
-        df.index = pd.to_datetime(df['mdy'].str.strip() + df['hms'].str.strip(),
-                                  format="%m/%d/%Y%H:%M:%S.%f")
+        df.index = parse_mdy_hms(df['mdy'], df['hms'])
         df.drop(['mdy', 'hms'], axis=1, inplace=True)
     elif timeformat == 'serial':
-        raise NotImplementedError
-        #df.index = datenum_to_datetime(df['datenum'])
+        # present day serial dates are only resolved to ~10 microseconds, so
+        # the 10 microsecond digit is noise. Round to the finest unit they
+        # represent exactly, while SOW and hms times are parsed exactly.
+        df.index = datenum_to_datetime(df['datenum'].values).round(Micro(100))
+        df.drop(['datenum'], axis=1, inplace=True)
 
     # remove leap second
     if is_utc:
-        # TODO: Check dates at beginning and end to determine whether a leap second was added in the middle of the survey.
-        shift = leap_seconds(datetime=df.index[0])
-        df.index = df.index.shift(-shift, freq='S')
+        # correct each sample so that a leap second inserted during the
+        # survey is handled
+        shift = leap_seconds_array(df.index)
+        df.index = df.index - pd.to_timedelta(shift, unit='s')
+        if len(shift) and np.any(shift != shift[0]):
+            # the second following a leap second is shifted onto the second
+            # preceding it, keep the samples of the earlier second
+            repeated = df.index.duplicated(keep='first')
+            if repeated.any():
+                warnings.warn('Dropped {n} sample(s) which fell on earlier '
+                              'samples after removing the leap second at '
+                              '{time}'.format(n=repeated.sum(),
+                                              time=df.index[repeated][0]),
+                              stacklevel=3)
+                df = df[~repeated]
+
+    return df
 
+
+def _regularize_trajectory(df, interval=0, interp=False, gaps=False,
+                           dtype_profile=None):
+    """
+    Fill the time gaps of parsed trajectory data with NaNs (or interpolated
+    values), or build its gap table, and apply the dtype profile.
+    """
     # set or infer the interval
     # TO DO: Need to infer interval for both cases to know whether resample
     if interval > 0:
@@ -128,6 +244,11 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
     else:
         offset_str = '100000U'
 
+    if gaps:
+        if dtype_profile is not None:
+            df = apply_dtype_profile(df, dtype_profile)
+        return df, find_gaps(df.index, offset_str)
+
     # fill gaps with NaNs
     new_index = pd.date_range(df.index[0], df.index[-1], freq=offset_str)
     df = df.reindex(new_index)
@@ -140,4 +261,274 @@ def import_trajectory(filepath, delim_whitespace=False, interval=0,
         for col in numeric.columns:
             df[col] = numeric[col]
 
+    if dtype_profile is not None:
+        df = apply_dtype_profile(df, dtype_profile)
+
     return df
+
+
+def import_trajectories(paths, interval=0, interp=False, gaps=False,
+                        dtype_profile=None, processes=None, **kwargs):
+    """
+    Read, parse and merge several ASCII trajectory files, e.g. the sessions
+    of a flight.
+
+    The files are parsed in parallel and merged on the time index. Where
+    files overlap, the sample from the file that comes first in paths is
+    kept. Time gaps are filled (or tabulated) once, on the merged data.
+
+    Parameters
+    ----------
+    paths : List[str]
+        Filesystem paths to trajectory data files
+    interval : float, Optional
+        Output data rate. Default behavior is to infer the rate.
+    interp : Union[List[str], List[int]], Optional
+        Gaps in data will be filled with interpolated values.
+    gaps : bool, Optional
+        Do not fill time gaps with NaNs, return the gap table along with the
+        data instead. Default: False
+    dtype_profile : str or dict, Optional
+        Name of a dtype profile or mapping of column names to dtypes.
+    processes : int or None, Optional
+        Number of worker processes used to parse the files. If None, the
+        number of processors on the machine. Default: None
+        The files are parsed in this process if the parsing options can't be
+        pickled, e.g. a callable skiprows.
+    **kwargs
+        Parsing options passed to :func:`import_trajectory` for every file,
+        e.g. columns, skiprows, timeformat, sep and is_utc.
+
+    Returns
+    -------
+    DataFrame
+        Pandas DataFrame of the merged trajectory data.
+    (DataFrame, DataFrame)
+        Trajectory data and the gap table, if gaps is True.
+
+    """
+    if not paths:
+        raise ValueError('No trajectory files to import')
+
+    reader = partial(_parse_trajectory, **kwargs)
+    if processes != 1 and len(paths) > 1 and _picklable(kwargs):
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            frames = list(executor.map(reader, paths))
+    else:
+        frames = [reader(path) for path in paths]
+
+    df = pd.concat(frames)
+    # stable sort, so that among equal times the earlier file comes first
+    order = np.argsort(df.index.asi8, kind='mergesort')
+    df = df.iloc[order]
+    df = df[~df.index.duplicated(keep='first')]
+
+    return _regularize_trajectory(df, interval, interp, gaps, dtype_profile)
+
+
+def _picklable(obj):
+    """ Whether obj can be sent to a worker process """
+    try:
+        pickle.dumps(obj)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+TRAJECTORY_PROFILE_NAME = '.trajectory_profile.json'
+
+_NUMBER_RE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_DATE_RE = re.compile(r'^\d{1,2}/\d{1,2}/\d{4}$')
+_TIME_RE = re.compile(r'^\d{1,2}:\d{2}:\d{2}(\.\d*)?$')
+
+# header keywords identifying the role of a column, in order of precedence
+_COLUMN_ROLES = [('pdop', ('pdop',)),
+                 ('lat', ('lat',)),
+                 ('long', ('lon',)),
+                 ('ell_ht', ('ell', 'hae')),
+                 ('ortho_ht', ('orth', 'msl')),
+                 ('num_sats', ('sat', 'nsv'))]
+
+_TIME_COLUMNS = {'sow': ['week', 'sow'],
+                 'hms': ['mdy', 'hms'],
+                 'serial': ['datenum']}
+
+
+def _split_fields(line, sep):
+    if sep == ',' or sep == '\t':
+        return [field.strip() for field in line.strip().split(sep)]
+    return line.split()
+
+
+def _is_data_line(fields):
+    return bool(fields) and all(_NUMBER_RE.match(f) or _DATE_RE.match(f) or
+                                _TIME_RE.match(f) for f in fields)
+
+
+def _sniff_timeformat(fields):
+    if (len(fields) > 1 and _DATE_RE.match(fields[0])
+            and _TIME_RE.match(fields[1])):
+        return 'hms'
+
+    try:
+        first = float(fields[0])
+        second = float(fields[1]) if len(fields) > 1 else None
+    except ValueError:
+        first = second = None
+
+    if (first is not None and second is not None and first.is_integer()
+            and 0 <= first < 10000 and 0 <= second < 604800):
+        return 'sow'
+    # serial date numbers of the years 1900 to 2100
+    if first is not None and 693962 <= first < 767011:
+        return 'serial'
+
+    raise ValueError('Unable to infer the time format from {line!r}'
+                     .format(line=fields))
+
+
+def _sniff_columns(timeformat, nfields, header=None):
+    """
+    Assign roles to the fields of a trajectory file. Fields following the
+    time fields are identified from the header names where available,
+    otherwise they are assumed to be latitude, longitude and ellipsoidal
+    height. Fields without a role are None.
+    """
+    columns = list(_TIME_COLUMNS[timeformat])
+    ntime = len(columns)
+
+    if header is None or len(header) != nfields:
+        roles = ['lat', 'long', 'ell_ht']
+        columns.extend(roles[:nfields - ntime])
+        return columns + [None] * (nfields - len(columns))
+
+    assigned = set()
+    for name in header[ntime:]:
+        key = re.sub(r'[^a-z]', '', name.lower())
+        role = None
+        for candidate, keywords in _COLUMN_ROLES:
+            if candidate not in assigned and any(k in key for k in keywords):
+                role = candidate
+                assigned.add(role)
+                break
+        columns.append(role)
+    return columns
+
+
+def _sniff_lines(lines):
+    """
+    Infer the import_trajectory options of a file from its leading lines.
+
+    Returns the options and the header lines preceding the data.
+    """
+    data = [line for line in lines if line.strip()]
+    if not data:
+        raise ValueError('No trajectory data to sniff')
+
+    sep = _line_sep(data[-1])
+    skiprows = 0
+    for line in lines:
+        if _is_data_line(_split_fields(line, sep)):
+            break
+        skiprows += 1
+    else:
+        raise ValueError('No trajectory data found in the leading lines')
+
+    fields = _split_fields(lines[skiprows], sep)
+    timeformat = _sniff_timeformat(fields)
+    header = _split_fields(lines[skiprows - 1], sep) if skiprows else None
+    columns = _sniff_columns(timeformat, len(fields), header)
+
+    options = {'sep': sep, 'skiprows': skiprows or None,
+               'timeformat': timeformat, 'columns': columns}
+    return options, [line.rstrip('\r\n') for line in lines[:skiprows]]
+
+
+def _matches_profile(lines, header, options):
+    """
+    Whether the leading lines of a file fit a stored profile: the same header
+    lines, followed by data with the same delimiter, number of fields and
+    time format.
+    """
+    if [line.rstrip('\r\n') for line in lines[:len(header)]] != header:
+        return False
+    data = [line for line in lines[len(header):] if line.strip()]
+    if not data or _line_sep(data[0]) != options['sep']:
+        return False
+    fields = _split_fields(data[0], options['sep'])
+    if len(fields) != len(options['columns']) or not _is_data_line(fields):
+        return False
+    try:
+        return _sniff_timeformat(fields) == options['timeformat']
+    except ValueError:
+        return False
+
+
+def sniff_trajectory(filepath, nbytes=8192, cache=True):
+    """
+    Infer the format of an ASCII trajectory file from its first few KB.
+
+    The delimiter, the number of header rows, the time format and the role of
+    each column are detected, and returned as keyword arguments for
+    :func:`import_trajectory`, e.g.::
+
+        import_trajectory(path, **sniff_trajectory(path))
+
+    Parameters
+    ----------
+    filepath : str
+        Filesystem path to trajectory data file
+    nbytes : int, Optional
+        Number of bytes read from the beginning of the file. Default: 8192
+    cache : bool, Optional
+        Store the detected profile in the directory of the file (see
+        TRAJECTORY_PROFILE_NAME), keyed by the file extension. Other files of
+        the same type in the directory with the same header, and whose first
+        data line has the same delimiter, number of fields and time format,
+        reuse the profile without being sniffed. Default: True
+
+    Returns
+    -------
+    dict
+        Keyword arguments sep, skiprows, timeformat and columns.
+
+    Raises
+    ------
+    ValueError
+        If no data lines are found or the time format can't be inferred.
+    """
+    dirpath, name = os.path.split(os.path.abspath(filepath))
+    profile_path = os.path.join(dirpath, TRAJECTORY_PROFILE_NAME)
+    ext = os.path.splitext(name)[1].lower()
+
+    profiles = {}
+    if cache:
+        try:
+            with open(profile_path, 'r') as fd:
+                profiles = json.load(fd)
+        except (OSError, ValueError):
+            profiles = {}
+
+    with open(filepath, 'r') as fd:
+        text = fd.read(nbytes)
+        truncated = len(fd.read(1)) > 0
+    lines = text.splitlines(True)
+    if truncated and len(lines) > 1:
+        # the last line may be incomplete
+        lines = lines[:-1]
+
+    record = profiles.get(ext)
+    if record is not None and _matches_profile(lines, record['header'],
+                                               record['options']):
+        return dict(record['options'])
+
+    options, header = _sniff_lines(lines)
+    if cache:
+        profiles[ext] = {'header': header, 'options': options}
+        try:
+            with open(profile_path, 'w') as fd:
+                json.dump(profiles, fd, indent=2)
+        except OSError:
+            pass
+
+    return dict(options)
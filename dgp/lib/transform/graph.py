@@ -1,6 +1,9 @@
 # coding: utf-8
-from copy import copy
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor,
+                                FIRST_COMPLETED, wait)
 from functools import partial
+from itertools import count
+from types import MethodType
 from collections.abc import Iterable
 
 
@@ -9,16 +12,96 @@ class GraphError(Exception):
         self.graph = graph
         self.message = message
 
+
+# Result of a node which is not held in the memo
+_RELEASED = object()
+
+
+def _fingerprint(obj):
+    """
+    Fingerprint of a node function, parameter or value
+
+    Partial functions are fingerprinted by their function and bound
+    parameters, and bound methods by their function and instance. Hashable
+    objects are compared by value, and any other object by identity.
+    """
+    if isinstance(obj, partial):
+        keywords = sorted((k, _fingerprint(v)) for k, v in obj.keywords.items())
+        return ('partial', _fingerprint(obj.func),
+                tuple(_fingerprint(arg) for arg in obj.args), tuple(keywords))
+    if isinstance(obj, MethodType):
+        return ('method', obj.__func__, id(obj.__self__))
+    try:
+        hash(obj)
+    except TypeError:
+        return ('id', type(obj), id(obj))
+    return ('value', type(obj), obj)
+
+
+def _bound_to(func, obj):
+    """ Whether func, or the function of a partial, is a method of obj """
+    while isinstance(func, partial):
+        func = func.func
+    return isinstance(func, MethodType) and func.__self__ is obj
+
+
 # TODO: Better validation and more descriptive error messages to aid debugging
 # TODO: Looping?
 class TransformGraph:
-    def __init__(self, graph=None, verbose=False):
+    """
+    Graph of transforms, executed in dependency order
+
+    Parameters
+    ----------
+    graph: dict, optional
+        Transform graph. Each node is either a value, or a tuple of a function
+        and the keys (or lists of keys) of the nodes whose results are the
+        arguments of the function.
+    verbose: bool
+        Print the name of each node as it is processed
+    executor: str, optional
+        'thread' | 'process'
+        Execute the nodes whose dependencies are complete concurrently in a
+        pool of threads or processes. If None (default), nodes are executed
+        one at a time. For a process pool the functions and results of the
+        nodes must be picklable. Methods of the graph are run in a thread
+        instead, as pickling them would copy the whole graph along with its
+        inputs and results, so use module level functions for nodes which
+        should run in a process. Functions should not modify their arguments
+        in place, as concurrent nodes may share them.
+    workers: int, optional
+        Number of workers in the pool, by default chosen by the pool
+    outputs: list of str, optional
+        Keys of the output nodes. If given, the graph is executed in a memory
+        lean mode: only the results of the output nodes are retained, and any
+        other result is released as soon as the last node which consumes it
+        has run, so that peak memory is that of the live working set.
+
+    Notes
+    -----
+    The result of each node is memoized along with a fingerprint of the node
+    function, its bound parameters (see :func:`functools.partial`) and the
+    fingerprints of its inputs. When the graph is executed again after a node
+    was replaced (see :meth:`set_node` and :attr:`graph`), only the nodes whose
+    fingerprint changed, i.e. those downstream of the change, are recomputed,
+    along with any released results they depend on.
+    Values and parameters which are not hashable, such as DataFrames, are
+    compared by identity, so they must not be modified in place.
+    """
+    def __init__(self, graph=None, verbose=False, executor=None, workers=None,
+                 outputs=None):
         if graph is not None:
             self.transform_graph = graph
         self._init_graph()
         self._results = None
+        self._memo = {}
+        self._tokens = count()
         self._graph_changed = True
         self.verbose = verbose
+        self.executor = executor
+        self.workers = workers
+        self.outputs = outputs
+        self._outputs = None
 
     @classmethod
     def run(cls, *args, item=None):
@@ -40,11 +123,13 @@ class TransformGraph:
         """
         def func(*args):
             c = cls(*args)
-            results = c.execute()
             if item is None:
-                return results
-            else:
-                return results[item]
+                return c.execute()
+            # release any result which is not returned
+            if isinstance(item, str):
+                return c.execute(outputs=[item])[item]
+            results = c.execute(outputs=item)
+            return [results[k] for k in item]
         return func
 
     def _init_graph(self):
@@ -75,12 +160,34 @@ class TransformGraph:
         self._init_graph()
         self._graph_changed = True
 
+    def set_node(self, key, node):
+        """
+        Add a node to the graph, or replace the node with the same key
+
+        Only the nodes downstream of the node are recomputed on the next
+        execution of the graph.
+
+        Parameters
+        ----------
+        key: str
+            Key of the node
+        node
+            A value, or a tuple of a function and the keys of its arguments
+        """
+        graph = dict(self.transform_graph)
+        graph[key] = node
+        self.graph = graph
+
     @property
     def results(self):
         """ dict: Most recent result"""
         return self._results
 
     def _make_graph(self):
+        return Graph(self._adjacency_list())
+
+    def _adjacency_list(self):
+        """ Keys of the nodes that each node depends on """
         adjacency_list = {k: [] for k in self.transform_graph}
 
         for k in self.transform_graph:
@@ -91,37 +198,192 @@ class TransformGraph:
                         adjacency_list[k].append(x)
                     else:
                         adjacency_list[k] += x
-        return Graph(adjacency_list)
-
-    def execute(self):
-        """ Execute the transform graph """
-        if self._graph_changed:
-            order = copy(self._order)
-            results = {}
-
-            def _tuple_to_func(tup):
-                func = tup[0]
-                args = []
-                for arg in tup[1:]:
-                    # TODO: Account for any kind of iterable, including generators.
-                    if isinstance(arg, list):
-                        args.append([results[x] for x in arg])
+        return adjacency_list
+
+    def _node_call(self, k, results):
+        """ Function and arguments of tuple node k, from the results so far """
+        node = self.transform_graph[k]
+        args = []
+        for arg in node[1:]:
+            # TODO: Account for any kind of iterable, including generators.
+            if isinstance(arg, list):
+                args.append([results[x] for x in arg])
+            else:
+                args.append(results[arg])
+        return node[0], args
+
+    def _node_fingerprint(self, k, memo):
+        """ Fingerprint of node k, given the memo entries of its inputs """
+        node = self.transform_graph[k]
+        if not isinstance(node, tuple):
+            return _fingerprint(node)
+        # inputs are identified by the token of the result they hold
+        inputs = []
+        for arg in node[1:]:
+            if isinstance(arg, list):
+                inputs.append(tuple(memo[x][1] for x in arg))
+            else:
+                inputs.append(memo[arg][1])
+        return (_fingerprint(node[0]),) + tuple(inputs)
+
+    def _plan(self, outputs):
+        """
+        Memo entries of the nodes, and the keys of the nodes to compute
+
+        A node whose fingerprint is unchanged keeps the token of its memo
+        entry, so that its dependents are unchanged as well. The nodes to
+        compute are the outputs, and the inputs of the nodes to compute, of
+        which no result is memoized.
+        """
+        memo = {}
+        for k in reversed(self._order):
+            fingerprint = self._node_fingerprint(k, memo)
+            entry = self._memo.get(k)
+            if entry is None or entry[0] != fingerprint:
+                # the entry references the node so that the objects
+                # fingerprinted by identity are not collected and their ids
+                # reused
+                entry = (fingerprint, next(self._tokens),
+                         self.transform_graph[k], _RELEASED)
+            memo[k] = entry
+
+        adjacency_list = self._adjacency_list()
+        compute = set()
+        targets = list(outputs)
+        while targets:
+            k = targets.pop()
+            if k in compute or memo[k][3] is not _RELEASED:
+                continue
+            compute.add(k)
+            targets.extend(adjacency_list[k])
+        return memo, compute
+
+    def _compute(self, k, results):
+        if self.verbose:
+            print('Processing node {k!r}'.format(k=k))
+        node = self.transform_graph[k]
+        if isinstance(node, tuple):
+            func, args = self._node_call(k, results)
+            return partial(func, *args)()
+        return node
+
+    def _execute_serial(self, compute, results, release):
+        for k in reversed(self._order):
+            if k in compute:
+                results[k] = self._compute(k, results)
+                release(k)
+
+    def _execute_parallel(self, compute, results, release, executor,
+                          workers=None):
+        pools = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+        if executor not in pools:
+            raise ValueError('Unknown executor {!r}'.format(executor))
+
+        dependencies = {k: set(deps) & compute
+                        for k, deps in self._adjacency_list().items()
+                        if k in compute}
+        dependents = {k: [] for k in compute}
+        for k, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].append(k)
+
+        # dispatch ready nodes in the serial order of execution
+        rank = {k: i for i, k in enumerate(reversed(self._order))}
+        ready = [k for k, deps in dependencies.items() if not deps]
+        running = {}
+
+        def _complete(k):
+            release(k)
+            for dependent in dependents[k]:
+                dependencies[dependent].discard(k)
+                if not dependencies[dependent]:
+                    ready.append(dependent)
+
+        # threads for the nodes which can't be sent to a process efficiently
+        with pools[executor](max_workers=workers) as pool, \
+                ThreadPoolExecutor(max_workers=workers) as local:
+            while ready or running:
+                ready.sort(key=rank.get)
+                while ready:
+                    k = ready.pop(0)
+                    node = self.transform_graph[k]
+                    if isinstance(node, tuple):
+                        if self.verbose:
+                            print('Processing node {k!r}'.format(k=k))
+                        func, args = self._node_call(k, results)
+                        target = pool
+                        if executor == 'process' and _bound_to(func, self):
+                            target = local
+                        running[target.submit(func, *args)] = k
                     else:
-                        args.append(results[arg])
-                new_tup = tuple([func] + args)
-                return partial(*new_tup)
-
-            while order:
-                k = order.pop()
-                if self.verbose:
-                    print('Processing node {k!r}'.format(k=k))
-                node = self.transform_graph[k]
-                if isinstance(node, tuple):
-                    f = _tuple_to_func(node)
-                    results[k] = f()
-                else:
-                    results[k] = self.transform_graph[k]
-            self._results = results
+                        results[k] = self._compute(k, results)
+                        _complete(k)
+
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in sorted(done, key=lambda f: rank[running[f]]):
+                        k = running.pop(future)
+                        results[k] = future.result()
+                        _complete(k)
+
+    def execute(self, executor=None, workers=None, outputs=None):
+        """
+        Execute the transform graph
+
+        Parameters
+        ----------
+        executor: str, optional
+            'thread' | 'process'
+            Overrides the executor given to the initializer for this call
+        workers: int, optional
+            Overrides the number of workers given to the initializer
+        outputs: list of str, optional
+            Overrides the output nodes given to the initializer
+
+        Returns
+        -------
+        dict
+            Result of each output node, or of every node if no outputs are
+            given
+        """
+        executor = executor or self.executor
+        workers = workers or self.workers
+        outputs = outputs or self.outputs
+        if self._graph_changed or outputs != self._outputs:
+            retain = set(self.transform_graph if outputs is None else outputs)
+            memo, compute = self._plan(retain)
+            adjacency_list = self._adjacency_list()
+
+            # inputs which are not recomputed are taken from the memo
+            needed = retain.union(*(adjacency_list[k] for k in compute))
+            results = {k: memo[k][3] for k in needed - compute}
+
+            # number of nodes still to compute which consume each result
+            consumers = {k: 0 for k in needed}
+            for k in compute:
+                for dep in set(adjacency_list[k]):
+                    consumers[dep] += 1
+
+            def release(k):
+                """ Release the inputs of node k consumed by all dependents """
+                if k in retain:
+                    memo[k] = memo[k][:3] + (results[k],)
+                for dep in set(adjacency_list[k]):
+                    consumers[dep] -= 1
+                    if not consumers[dep] and dep not in retain:
+                        del results[dep]
+
+            if executor is None:
+                self._execute_serial(compute, results, release)
+            else:
+                self._execute_parallel(compute, results, release, executor,
+                                       workers)
+            self._memo = {k: entry if k in retain else entry[:3] + (_RELEASED,)
+                          for k, entry in memo.items()}
+            # same ordering of the results as serial execution
+            self._results = {k: results[k] for k in reversed(self._order)
+                             if k in retain}
+            self._outputs = outputs
             self._graph_changed = False
 
         return self._results
@@ -7,7 +7,8 @@ from .graph import TransformGraph
 from .gravity import (eotvos_correction, latitude_correction,
                       free_air_correction, kinematic_accel)
 from .filters import lp_filter, bw_filter, sg_filter
-from ..timesync import find_time_delay, shift_frame
+from ..timesync import (find_time_delay, find_time_delays, shift_frame,
+                        shift_frame_varying)
 from ..etc import align_frames
 from .derivatives import taylor_fir, central_difference
 
@@ -16,14 +17,30 @@ def demux(df, col):
     return df[col]
 
 
+def total_corr(*args):
+    return pd.Series(sum(*args), name='total_corr')
+
+
+def corrected_grav(*args):
+    return pd.Series(sum(*args), name='corrected_grav')
+
+
 class SyncGravity(TransformGraph):
     # TODO: align_frames only works with this ordering, but should work for either
-    def __init__(self, kin_accel, gravity):
+    # If window (seconds) is given, a time-varying delay is estimated over
+    # sliding windows and applied instead of a single delay
+    def __init__(self, kin_accel, gravity, window=None):
+        if window is None:
+            delay = (find_time_delay, 'kin_accel', 'raw_grav')
+            shifted = (shift_frame, 'gravity', 'delay')
+        else:
+            delay = (partial(find_time_delays, window=window), 'kin_accel', 'raw_grav')
+            shifted = (shift_frame_varying, 'gravity', 'delay')
         self.transform_graph = {'gravity': gravity,
                                 'raw_grav': gravity['gravity'],
                                 'kin_accel': kin_accel,
-                                'delay': (find_time_delay, 'kin_accel', 'raw_grav'),
-                                'shifted_gravity': (shift_frame, 'gravity', 'delay'),
+                                'delay': delay,
+                                'shifted_gravity': shifted,
                                 }
         super().__init__()
 
@@ -33,12 +50,11 @@ class SyncGravity(TransformGraph):
 
 class AirbornePost(TransformGraph):
     # concat = partial(pd.concat, axis=1, join='outer')
-
-    def total_corr(self, *args):
-        return pd.Series(sum(*args), name='total_corr')
-
-    def corrected_grav(self, *args):
-        return pd.Series(sum(*args), name='corrected_grav')
+    # Nodes concatenated by result_df, which are the only outputs required
+    # when executing with outputs=AirbornePost.result_nodes
+    result_nodes = ['trajectory', 'aligned_eotvos', 'aligned_kin_accel',
+                    'lat_corr', 'fac', 'total_corr', 'abs_grav',
+                    'corrected_grav']
 
     # TODO: What if a function takes a string argument? Use partial for now.
     # TODO: Little tricky to debug these graphs. Breakpoints? Print statements?
@@ -54,9 +70,9 @@ class AirbornePost(TransformGraph):
                                 'aligned_kin_accel': (partial(align_frames, item='r'), 'trajectory', 'kin_accel'),
                                 'lat_corr': (latitude_correction, 'trajectory'),
                                 'fac': (free_air_correction, 'trajectory'),
-                                'total_corr': (self.total_corr, ['aligned_kin_accel', 'aligned_eotvos', 'lat_corr', 'fac']),
+                                'total_corr': (total_corr, ['aligned_kin_accel', 'aligned_eotvos', 'lat_corr', 'fac']),
                                 'abs_grav': (partial(demux, col='gravity'), 'gravity'),
-                                'corrected_grav': (self.corrected_grav, ['total_corr', 'abs_grav']),
+                                'corrected_grav': (corrected_grav, ['total_corr', 'abs_grav']),
                                 'filtered_grav': (partial(lp_filter, filter_len=100, fs=10), 'corrected_grav')
                                 }
         super().__init__()
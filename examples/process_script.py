@@ -46,8 +46,8 @@ if trajectory_source == 'Waypoint':
     trajectory_engine = 'c'
     trajectory_delim = ','
 else:
-    trajectory_engine = 'python'
-    trajectory_delim = '\s+'
+    trajectory_engine = 'c'
+    trajectory_delim = r'\s+'
 
 # Load Data Files
 print('\nImporting gravity')
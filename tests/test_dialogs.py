@@ -176,6 +176,19 @@ class TestDialogs:
         dlg.qchb_traj_isutc.setChecked(False)
         assert not _traj_map['is_utc']()
 
+        # the sniffed format does not replace the defaults of the time format
+        dlg._sniff_trajectory(Path('tests/sample_trajectory.txt'))
+        assert 'hms' == _traj_map['timeformat']()
+        assert ['mdy', 'hms', 'lat', 'long', 'ortho_ht', 'ell_ht', 'num_sats',
+                'pdop'] == _traj_map['columns']()
+        assert 1 == _traj_map['skiprows']()
+        assert not Path('tests/.trajectory_profile.json').exists()
+
+        unknown = _path.joinpath('unknown.txt')
+        unknown.write_text('not a trajectory\n')
+        dlg._sniff_trajectory(unknown)
+        assert _time_col_map['hms'] == _traj_map['columns']()
+
         # Test emission of DataFile on _load_file
         # TODO: Fix this, need an actual file to test loading
         # assert dlg.datatype == DataType.GRAVITY
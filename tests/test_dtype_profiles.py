@@ -0,0 +1,58 @@
+# coding: utf-8
+import numpy as np
+import pandas as pd
+import pytest
+
+from dgp.lib.dtype_profiles import apply_dtype_profile, get_dtype_profile
+from dgp.lib.gravity_ingestor import read_at1a, status_flag
+from dgp.lib.trajectory_ingestor import import_trajectory
+
+TEST_FILE_GRAV = 'tests/sample_gravity.csv'
+TEST_FILE_GPS = 'tests/sample_trajectory.txt'
+
+
+def test_at1a_compact():
+    full = read_at1a(TEST_FILE_GRAV)
+    compact = read_at1a(TEST_FILE_GRAV, dtype_profile='at1a_compact')
+
+    assert compact.shape == (10, 10)
+    assert compact.memory_usage().sum() < full.memory_usage().sum()
+    assert compact['gravity'].dtype == np.float64
+    assert compact['long_accel'].dtype == np.float32
+    np.testing.assert_array_equal(compact['gravity'], full['gravity'])
+    np.testing.assert_allclose(compact['long_accel'], full['long_accel'],
+                               rtol=1e-6)
+
+    # status word is packed, and stored as float where gaps were filled
+    assert compact['status'].dtype == np.float32
+    np.testing.assert_array_equal(status_flag(compact['status'], 'clamp'),
+                                  full['clamp'].fillna(False).astype(bool))
+
+    compact = read_at1a(TEST_FILE_GRAV, fill_with_nans=False,
+                        dtype_profile='at1a_compact')
+    assert compact['status'].dtype == np.uint32
+    assert compact['gps_week'].dtype == np.uint16
+
+
+def test_trajectory_compact():
+    compact = import_trajectory(TEST_FILE_GPS, skiprows=1, timeformat='hms',
+                                columns=['mdy', 'hms', 'lat', 'long', 'ell_ht',
+                                         'ortho_ht', 'num_sats', 'pdop'],
+                                dtype_profile='trajectory_compact', gaps=True)[0]
+    assert compact['lat'].dtype == np.float64
+    assert compact['ell_ht'].dtype == np.float32
+    assert compact['num_sats'].dtype == np.uint8
+
+
+def test_apply_dtype_profile():
+    frame = pd.DataFrame({'a': [1.0, np.nan], 'b': [1.5, 2.5], 'c': [1, 2],
+                          'd': [2.0 ** 30, np.nan]})
+    res = apply_dtype_profile(frame, {'a': np.uint8, 'b': np.float32,
+                                      'c': np.int16, 'd': np.int64})
+    assert res['a'].dtype == np.float32
+    assert res['b'].dtype == np.float32
+    assert res['c'].dtype == np.int16
+    assert res['d'].dtype == np.float64
+
+    with pytest.raises(KeyError):
+        get_dtype_profile('not_a_profile')
@@ -2,7 +2,7 @@ import unittest
 import numpy as np
 import pandas as pd
 
-from dgp.lib.etc import align_frames
+from dgp.lib.etc import align_frames, find_gaps, split_runs
 
 
 class TestAlignOps(unittest.TestCase):
@@ -133,3 +133,35 @@ class TestAlignOps(unittest.TestCase):
         aframe1, aframe2 = align_frames(frame1, frame2, align_to='right',
                                         fill={'B': 0})
         self.assertTrue(aframe1['B'].equals(left['B']))
+
+
+class TestGaps(unittest.TestCase):
+    def test_find_gaps(self):
+        ticks = np.array([0, 1, 2, 5, 6, 10, 11]) * 100
+        index = pd.Timestamp('2018-01-29 15:00:00') + pd.to_timedelta(ticks, unit='ms')
+        gaps = find_gaps(index, '100000U')
+
+        self.assertEqual(gaps['count'].tolist(), [2, 3])
+        self.assertEqual(gaps['start'].iloc[0], index[2] + pd.Timedelta('100ms'))
+        self.assertEqual(gaps['stop'].iloc[0], index[3] - pd.Timedelta('100ms'))
+        self.assertEqual(gaps['start'].iloc[1], index[4] + pd.Timedelta('100ms'))
+        self.assertEqual(gaps['stop'].iloc[1], index[5] - pd.Timedelta('100ms'))
+
+        # the same gaps are filled by reindexing to the full time grid
+        full = pd.date_range(index[0], index[-1], freq='100000U')
+        self.assertEqual(gaps['count'].sum(), len(full) - len(index))
+
+        # jitter below half an interval is not a gap
+        jittered = index + pd.to_timedelta([0, 30, 0, 0, 0, 0, 0], unit='ms')
+        self.assertEqual(len(find_gaps(jittered, '100000U')), 2)
+
+        self.assertTrue(find_gaps(index[:3], '100000U').empty)
+
+    def test_split_runs(self):
+        ticks = np.array([0, 1, 2, 5, 6, 10, 11]) * 100
+        index = pd.Timestamp('2018-01-29 15:00:00') + pd.to_timedelta(ticks, unit='ms')
+        frame = pd.DataFrame({'a': np.arange(7)}, index=index)
+        runs = split_runs(frame, find_gaps(index, '100000U'))
+
+        self.assertEqual([len(run) for run in runs], [3, 2, 2])
+        self.assertTrue(pd.concat(runs).equals(frame))
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from PyQt5.QtTest import QSignalSpy
+
+from dgp.core import DataType
+from dgp.core.file_tailer import FileTailer
+from dgp.core.hdf5_manager import HDF5Manager
+from dgp.core.models.datafile import DataFile
+from dgp.lib.gravity_ingestor import read_at1a
+from dgp.lib.trajectory_ingestor import import_trajectory
+
+TEST_FILE_GRAV = 'tests/sample_gravity.csv'
+TEST_FILE_GPS = 'tests/sample_trajectory.txt'
+
+
+def test_tail_gravity(qt_app, hdf5file: Path, tmpdir):
+    source = Path(str(tmpdir)).joinpath('live_gravity.csv')
+    lines = Path(TEST_FILE_GRAV).read_text().splitlines(keepends=True)
+    datafile = DataFile(DataType.GRAVITY, datetime.now(), source)
+
+    tailer = FileTailer(source, read_at1a, datafile, hdf5file, parent=qt_app)
+    spy = QSignalSpy(tailer.appended)
+
+    source.write_text(''.join(lines[:4]))
+    data = tailer.poll()
+    assert 4 == len(data)
+    assert 1 == len(spy)
+    assert 4 == len(HDF5Manager.load_data(datafile, hdf5file))
+
+    # a partially written line is left for the next poll
+    partial = lines[6][:20]
+    with source.open('a') as fd:
+        fd.write(''.join(lines[4:6]) + partial)
+    assert 2 == len(tailer.poll())
+    assert tailer.offset == len(''.join(lines[:6]))
+
+    # nothing new was completed
+    assert tailer.poll() is None
+    assert 2 == len(spy)
+
+    with source.open('a') as fd:
+        fd.write(lines[6][20:] + ''.join(lines[7:]))
+    assert 3 == len(tailer.poll())
+
+    expected = read_at1a(TEST_FILE_GRAV, fill_with_nans=False)
+    loaded = HDF5Manager.load_data(datafile, hdf5file)
+    assert expected.index.equals(loaded.index)
+    assert expected['gravity'].equals(loaded['gravity'])
+
+
+def test_tail_trajectory(qt_app, hdf5file: Path, tmpdir):
+    source = Path(str(tmpdir)).joinpath('live_gps.txt')
+    lines = Path(TEST_FILE_GPS).read_text().splitlines(keepends=True)
+    datafile = DataFile(DataType.TRAJECTORY, datetime.now(), source)
+    fields = ['mdy', 'hms', 'lat', 'long', 'ell_ht', 'ortho_ht', 'num_sats',
+              'pdop']
+
+    expected = import_trajectory(TEST_FILE_GPS, columns=list(fields),
+                                 skiprows=1, timeformat='hms')
+
+    # existing data written in the fixed format is converted on first append
+    HDF5Manager.save_data(expected[:0], datafile, hdf5file)
+
+    tailer = FileTailer(source, import_trajectory, datafile, hdf5file,
+                        parent=qt_app, columns=fields, skiprows=1,
+                        timeformat='hms')
+    # only the header has been written
+    source.write_text(lines[0][:10])
+    assert tailer.poll() is None
+    assert 0 == tailer.offset
+    source.write_text(lines[0])
+    assert tailer.poll() is None
+    assert len(lines[0]) == tailer.offset
+
+    with source.open('a') as fd:
+        fd.write(''.join(lines[1:6]))
+    assert tailer.poll() is not None
+    with source.open('a') as fd:
+        fd.write(''.join(lines[6:]))
+    tailer.poll()
+
+    loaded = HDF5Manager.load_data(datafile, hdf5file)
+    assert expected.index.equals(loaded.index)
+    assert expected['lat'].equals(loaded['lat'])
+
+
+def test_tail_skips_malformed(qt_app, hdf5file: Path, tmpdir):
+    source = Path(str(tmpdir)).joinpath('live_gravity.csv')
+    lines = Path(TEST_FILE_GRAV).read_text().splitlines(keepends=True)
+    datafile = DataFile(DataType.GRAVITY, datetime.now(), source)
+    bad = ['1,2,3,4,5,6,7,8,9,10,11,12\n', lines[3][:30] + '\n']
+
+    tailer = FileTailer(source, read_at1a, datafile, hdf5file, parent=qt_app)
+    errors = QSignalSpy(tailer.error)
+
+    # complete but malformed lines are skipped, along with the data after them
+    source.write_text(''.join(lines[:2]) + bad[0] + ''.join(lines[2:4]))
+    assert 4 == len(tailer.poll())
+    assert 1 == len(errors)
+    assert tailer.offset == source.stat().st_size
+
+    # later data is still appended
+    with source.open('a') as fd:
+        fd.write(bad[1] + ''.join(lines[4:]))
+    assert len(lines) - 4 == len(tailer.poll())
+    assert 2 == len(errors)
+    assert tailer.offset == source.stat().st_size
+
+    expected = read_at1a(TEST_FILE_GRAV, fill_with_nans=False)
+    loaded = HDF5Manager.load_data(datafile, hdf5file)
+    assert expected.index.equals(loaded.index)
+    assert expected['gravity'].equals(loaded['gravity'])
+
+
+def test_tail_recovers(qt_app, hdf5file: Path, tmpdir):
+    source = Path(str(tmpdir)).joinpath('live_gravity.csv')
+    lines = Path(TEST_FILE_GRAV).read_text().splitlines(keepends=True)
+    datafile = DataFile(DataType.GRAVITY, datetime.now(), source)
+    appends = []
+    append_data = HDF5Manager.append_data
+
+    def flaky_append(data, datafile, path):
+        appends.append(data)
+        if len(appends) == 1:
+            raise OSError('HDF5 file is locked')
+        return append_data(data, datafile, path)
+
+    source.write_text(''.join(lines[:4]))
+    tailer = FileTailer(source, read_at1a, datafile, hdf5file,
+                        parent=qt_app, interval=10)
+    errors = QSignalSpy(tailer.error)
+    appended = QSignalSpy(tailer.appended)
+    with mock.patch.object(HDF5Manager, 'append_data', flaky_append):
+        tailer.start()
+        assert appended.wait(2000)
+        tailer.requestInterruption()
+        tailer.wait()
+
+    # the block is appended again after the error, and tailing continues
+    assert 1 == len(errors)
+    assert 4 == len(appended[0][0])
+    assert tailer.offset == len(''.join(lines[:4]))
@@ -1,7 +1,10 @@
 # coding: utf-8
 
 import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
 import datetime
@@ -116,3 +119,167 @@ class TestGravityIngestor(unittest.TestCase):
             df = gi.read_zls(os.path.abspath('tests/sample_zls'),
                              begin_time=ok_begin_time,
                              end_time=oob_begin_time)
+
+        # times selecting no files
+        df = gi.read_zls(os.path.abspath('tests/sample_zls'),
+                         begin_time=datetime.datetime(2014, 1, 1),
+                         end_time=datetime.datetime(2014, 1, 2))
+        self.assertTrue(df.empty)
+
+    def test_read_bitfield_widths(self):
+        # 16-bit words are still decoded as 32 columns
+        status = np.array([21061] * 5, dtype=np.uint16)
+        unpacked = gi._extract_bits(status)
+        self.assertEqual(unpacked.shape, (5, 32))
+        self.assertEqual(unpacked.values[0, :3].tolist(), [1, 0, 1])
+
+        # words using the upper 32 bits are decoded to 64 columns
+        status = pd.Series(np.array([1 << 40] * 3, dtype=np.uint64))
+        unpacked = gi._extract_bits(status, as_bool=True)
+        self.assertEqual(unpacked.shape, (3, 64))
+        self.assertTrue(unpacked[40].all())
+        self.assertEqual(unpacked.values.sum(), 3)
+
+    def test_status_flag(self):
+        status = pd.Series(data=[21061, 0, np.nan])
+        flag = gi.status_flag(status, 'clamp')
+        self.assertEqual(flag.tolist(), [True, False, False])
+        self.assertFalse(gi.status_flag(status, 'unclamp').any())
+
+        with self.assertRaises(KeyError):
+            gi.status_flag(status, 'not_a_flag')
+
+    def test_import_at1a_packed_status(self):
+        df = gi.read_at1a(os.path.abspath('tests/sample_gravity.csv'),
+                          fill_with_nans=False, expand_status=False)
+        self.assertEqual(df.shape, (9, 10))
+        self.assertIn('status', df.columns)
+
+        expanded = gi.read_at1a(os.path.abspath('tests/sample_gravity.csv'),
+                                fill_with_nans=False)
+        for field in gi.DGS_AT1A_STATUS_FIELDS:
+            np.testing.assert_array_equal(gi.status_flag(df['status'], field),
+                                          expanded[field])
+
+    def test_iter_at1a(self):
+        path = os.path.abspath('tests/sample_gravity.csv')
+        expected = gi.read_at1a(path)
+
+        chunks = list(gi.iter_at1a(path, chunksize=2))
+        self.assertTrue(len(chunks) > 1)
+        for chunk in chunks:
+            self.assertTrue(chunk.index.is_monotonic_increasing)
+
+        # chunks are continuous and gaps at chunk boundaries are filled
+        df = pd.concat(chunks)
+        self.assertEqual(df.shape, expected.shape)
+        self.assertTrue(df.index.equals(expected.index))
+        self.assertTrue(df.iloc[[2]].isnull().values.all())
+        np.testing.assert_array_equal(df['gravity'], expected['gravity'])
+
+    def test_iter_at1a_no_fill_nans(self):
+        path = os.path.abspath('tests/sample_gravity.csv')
+        expected = gi.read_at1a(path, fill_with_nans=False)
+        df = pd.concat(gi.iter_at1a(path, chunksize=4, fill_with_nans=False))
+        self.assertEqual(df.shape, expected.shape)
+        self.assertTrue(df.equals(expected))
+
+    def test_import_zls_processes(self):
+        expected = gi.read_zls(os.path.abspath('tests/sample_zls'))
+        df = gi.read_zls(os.path.abspath('tests/sample_zls'), processes=2)
+        self.assertTrue(df.equals(expected))
+
+        begin_time = datetime.datetime(2015, 11, 12, hour=0, minute=30)
+        end_time = datetime.datetime(2015, 11, 12, hour=2, minute=30)
+        df = gi.read_zls(os.path.abspath('tests/sample_zls'),
+                         begin_time=begin_time, end_time=end_time,
+                         processes=2)
+        self.assertTrue(df.index[0] == begin_time)
+        self.assertTrue(df.index[-1] == end_time)
+
+    def test_import_zls_manifest(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for name in ['2015_00.316', '2015_01.316']:
+            shutil.copy(os.path.join('tests/sample_zls', name), tmpdir)
+
+        expected = gi.read_zls(tmpdir)
+        df = gi.read_zls(tmpdir, use_manifest=True)
+        self.assertTrue(df.equals(expected))
+        self.assertTrue(os.path.isfile(os.path.join(tmpdir, gi.ZLS_MANIFEST_NAME)))
+
+        # unchanged files are not parsed again
+        with mock.patch.object(gi, '_read_zls_format_file',
+                               wraps=gi._read_zls_format_file) as parse:
+            df = gi.read_zls(tmpdir, use_manifest=True)
+            self.assertEqual(parse.call_count, 0)
+            self.assertTrue(df.equals(expected))
+
+            begin_time = datetime.datetime(2015, 11, 12, hour=0, minute=30)
+            end_time = datetime.datetime(2015, 11, 12, hour=1, minute=30)
+            df = gi.read_zls(tmpdir, begin_time=begin_time, end_time=end_time,
+                             use_manifest=True)
+            self.assertEqual(parse.call_count, 0)
+            self.assertTrue(df.index[0] == begin_time)
+            self.assertTrue(df.index[-1] == end_time)
+
+        # only newly arrived files are parsed
+        shutil.copy('tests/sample_zls/2015_02.316', tmpdir)
+        with mock.patch.object(gi, '_read_zls_format_file',
+                               wraps=gi._read_zls_format_file) as parse:
+            df = gi.read_zls(tmpdir, use_manifest=True)
+            self.assertEqual(parse.call_count, 1)
+
+        expected = gi.read_zls(os.path.abspath('tests/sample_zls'))
+        self.assertTrue(df.equals(expected))
+
+    def test_import_zls_manifest_fallback(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        for name in ['2015_00.316', '2015_01.316']:
+            shutil.copy(os.path.join('tests/sample_zls', name), tmpdir)
+        # an hour file without data
+        open(os.path.join(tmpdir, '2015_02.316'), 'w').close()
+
+        expected = gi.read_zls(tmpdir)
+        df = gi.read_zls(tmpdir, use_manifest=True)
+        self.assertTrue(df.equals(expected))
+        df = gi.read_zls(tmpdir, begin_time=datetime.datetime(2014, 1, 1),
+                         end_time=datetime.datetime(2014, 1, 2),
+                         use_manifest=True)
+        self.assertTrue(df.empty)
+
+        # a read-only directory falls back to parsing every file
+        shutil.rmtree(os.path.join(tmpdir, gi.ZLS_CACHE_DIR))
+        os.remove(os.path.join(tmpdir, gi.ZLS_MANIFEST_NAME))
+        with mock.patch.object(gi.os, 'makedirs',
+                               side_effect=PermissionError('read-only')):
+            with self.assertWarns(UserWarning):
+                df = gi.read_zls(tmpdir, use_manifest=True)
+        self.assertTrue(df.equals(expected))
+        self.assertFalse(os.path.exists(os.path.join(tmpdir,
+                                                     gi.ZLS_MANIFEST_NAME)))
+
+    def test_read_at1a_malformed(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, 'malformed.csv')
+        with open('tests/sample_gravity.csv') as src, open(path, 'w') as dst:
+            lines = src.readlines()
+            lines[3] = lines[3].replace('62.253318', 'bad')
+            dst.writelines(lines)
+
+        df = gi.read_at1a(path, fill_with_nans=False)
+        self.assertEqual(df.shape, (9, 26))
+        self.assertEqual(df['temp'].iloc[3].strip(), 'bad')
+
+    def test_import_at1a_gaps(self):
+        path = os.path.abspath('tests/sample_gravity.csv')
+        df, gaps = gi.read_at1a(path, gaps=True)
+        self.assertEqual(df.shape, (9, 26))
+        self.assertFalse(df['gravity'].isnull().any())
+        self.assertEqual(len(gaps), 1)
+        self.assertEqual(gaps['count'].iloc[0], 1)
+
+        filled = gi.read_at1a(path)
+        self.assertEqual(gaps['start'].iloc[0], filled.index[2])
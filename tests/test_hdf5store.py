@@ -10,6 +10,7 @@ from dgp.core import DataType
 from dgp.core.models.flight import Flight
 from dgp.core.models.datafile import DataFile
 from dgp.core.hdf5_manager import HDF5Manager
+from dgp.lib.gravity_ingestor import read_at1a
 
 HDF5_FILE = "test.hdf5"
 
@@ -64,3 +65,14 @@ def test_ds_metadata(gravdata: DataFrame, hdf5file: Path):
 
     assert HDF5Manager._get_node_attr(empty_datafile.nodepath, 'test_attr',
                                       hdf5file) is None
+
+
+def test_datastore_dtype_profile(hdf5file: Path):
+    data = read_at1a('tests/sample_gravity.csv', dtype_profile='at1a_compact')
+    datafile = DataFile(DataType.GRAVITY, datetime.now(), Path('tests/test.dat'),
+                        column_format='at1a_compact')
+    HDF5Manager.save_data(data.astype(float), datafile, path=hdf5file)
+
+    HDF5Manager.clear_cache()
+    loaded = HDF5Manager.load_data(datafile, path=hdf5file)
+    assert data.dtypes.equals(loaded.dtypes)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import time
+from pathlib import Path
+from unittest import mock
+
+from dgp.core.import_cache import ImportCache
+from dgp.lib import gravity_ingestor
+from dgp.lib.gravity_ingestor import read_at1a
+
+TEST_FILE_GRAV = 'tests/sample_gravity.csv'
+
+
+def test_import_cache_load(tmpdir):
+    cache = ImportCache(Path(str(tmpdir)).joinpath('cache'))
+    calls = []
+
+    def counting_loader(path, **kwargs):
+        calls.append(kwargs)
+        return read_at1a(path, **kwargs)
+
+    expected = read_at1a(TEST_FILE_GRAV)
+    result = cache.load(Path(TEST_FILE_GRAV), counting_loader)
+    assert expected.equals(result)
+    assert 1 == len(calls)
+
+    # repeat imports, and imports of a copy of the file, are cache reads
+    copy = Path(str(tmpdir)).joinpath('copy.csv')
+    shutil.copy(TEST_FILE_GRAV, str(copy))
+    assert expected.equals(cache.load(Path(TEST_FILE_GRAV), counting_loader))
+    assert expected.equals(cache.load(copy, counting_loader))
+    assert 1 == len(calls)
+
+    # different parameters or file content are parsed
+    cache.load(copy, counting_loader, fill_with_nans=False)
+    assert 2 == len(calls)
+
+    with copy.open('a') as fd:
+        last = Path(TEST_FILE_GRAV).read_text().splitlines()[-1]
+        fd.write(last.replace('219698.200', '219698.300') + '\n')
+    cache.load(copy, counting_loader)
+    assert 3 == len(calls)
+
+    cache.clear()
+    cache.load(Path(TEST_FILE_GRAV), counting_loader)
+    assert 4 == len(calls)
+
+
+def test_import_cache_key():
+    path = Path(TEST_FILE_GRAV)
+    assert ImportCache.key(path, read_at1a) == ImportCache.key(path, read_at1a)
+    assert (ImportCache.key(path, read_at1a, skiprows=1) !=
+            ImportCache.key(path, read_at1a, skiprows=2))
+    assert (ImportCache.key(path, read_at1a, interp=True, skiprows=1) ==
+            ImportCache.key(path, read_at1a, skiprows=1, interp=True))
+
+    # entries of a previous version of the ingestors are not used
+    key = ImportCache.key(path, read_at1a)
+    with mock.patch.object(gravity_ingestor, 'CACHE_VERSION',
+                           gravity_ingestor.CACHE_VERSION + 1):
+        assert ImportCache.key(path, read_at1a) != key
+    with mock.patch('dgp.core.import_cache.__version__', '0.0.0'):
+        assert ImportCache.key(path, read_at1a) != key
+
+
+def test_import_cache_evict(tmpdir):
+    directory = Path(str(tmpdir)).joinpath('cache')
+    cache = ImportCache(directory)
+    data = read_at1a(TEST_FILE_GRAV)
+    cache.put('a', data)
+    size = directory.joinpath('a.pkl').stat().st_size
+
+    # the least recently used entry is evicted
+    cache.max_size = 2 * size
+    cache.put('b', data)
+    for key, age in [('a', 20), ('b', 10)]:
+        mtime = time.time() - age
+        os.utime(str(directory.joinpath(f'{key}.pkl')), (mtime, mtime))
+    assert cache.get('a') is not None
+    cache.put('c', data)
+    assert sorted(p.stem for p in directory.glob('*.pkl')) == ['a', 'c']
+
+
+def test_project_import_cache(prj_ctrl):
+    assert not prj_ctrl.entity.import_cache
+    assert prj_ctrl.toggle_import_cache()
+    assert prj_ctrl.entity.import_cache
+    assert not prj_ctrl.toggle_import_cache()
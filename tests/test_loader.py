@@ -9,6 +9,7 @@ from pandas import DataFrame
 
 
 from dgp.core.file_loader import FileLoader
+from dgp.core.import_cache import ImportCache
 
 TEST_FILE_GRAV = 'tests/sample_gravity.csv'
 
@@ -53,3 +54,13 @@ def test_load_failure(qt_app):
     loader.run()
     assert 1 == len(spy_err)
     assert called
+
+
+def test_load_cached(qt_app, tmpdir):
+    cache = ImportCache(Path(str(tmpdir)))
+    loader = FileLoader(Path(TEST_FILE_GRAV), mock_loader, qt_app, cache=cache)
+    spy_complete = QSignalSpy(loader.loaded)
+
+    loader.run()
+    assert 1 == len(spy_complete)
+    assert cache.get(ImportCache.key(Path(TEST_FILE_GRAV), mock_loader)) is not None
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dgp.core import DataType
+from dgp.core.hdf5_manager import HDF5Manager
+from dgp.core.models.datafile import DataFile
+from dgp.core.models.dataset import DataSet
+from dgp.core.models.flight import Flight
+from dgp.core.time_sync import sync_datasets
+from dgp.lib.gravity_ingestor import read_at1a
+from dgp.lib.transform.gravity import kinematic_accel
+
+
+def _trajectory(t, index):
+    return pd.DataFrame({'lat': 40 + 1e-4 * np.sin(0.05 * t),
+                         'long': -100 + 1e-3 * t / 600,
+                         'ell_ht': 1000 + 5 * np.sin(0.8 * t) + 20 * np.sin(0.2 * t)},
+                        index=index)
+
+
+def _dataset(hdf5file: Path, lag: float, name: str) -> DataSet:
+    t = np.arange(0, 600, 0.1)
+    index = pd.Timestamp('2018-05-01') + pd.to_timedelta(t, unit='s')
+    trajectory = _trajectory(t, index)
+    # gravity lagging the kinematic acceleration of the trajectory, computed
+    # over a longer span to exclude the edge effects of the differentiators
+    t_ext = np.arange(-10, 610, 0.1)
+    index_ext = index[0] + pd.to_timedelta(t_ext, unit='s')
+    kin_accel = kinematic_accel(_trajectory(t_ext - lag, index_ext)).values[100:-100]
+    gravity = pd.DataFrame({'gravity': kin_accel,
+                            'long_accel': np.zeros(len(t))}, index=index)
+
+    grav_file = DataFile(DataType.GRAVITY, datetime.now(), Path(f'{name}.dat'))
+    traj_file = DataFile(DataType.TRAJECTORY, datetime.now(), Path(f'{name}.txt'))
+    HDF5Manager.save_data(gravity, grav_file, hdf5file)
+    HDF5Manager.save_data(trajectory, traj_file, hdf5file)
+    return DataSet(grav_file, traj_file, name=name)
+
+
+def test_sync_datasets(hdf5file: Path):
+    flt1 = Flight('Flt1')
+    flt1.datasets.append(_dataset(hdf5file, 1.3, 'ds1'))
+    flt1.datasets.append(DataSet(name='empty'))
+    flt2 = Flight('Flt2')
+    flt2.datasets.append(_dataset(hdf5file, 0.8, 'ds2'))
+    missing = DataSet(DataFile(DataType.GRAVITY, datetime.now(), Path('x.dat')),
+                      DataFile(DataType.TRAJECTORY, datetime.now(), Path('x.txt')),
+                      name='missing')
+    flt2.datasets.append(missing)
+
+    report = sync_datasets([flt1, flt2], hdf5file, processes=2)
+    assert ['ds1', 'ds2', 'missing'] == list(report['dataset'])
+    assert ['Flt1', 'Flt2', 'Flt2'] == list(report['flight'])
+    delays = report.set_index('dataset')['delay']
+    assert abs(delays['ds1'] + 1.3) < 0.05
+    assert abs(delays['ds2'] + 0.8) < 0.05
+    assert np.isnan(delays['missing'])
+    assert report.set_index('dataset').at['missing', 'error']
+
+    # write the shifted gravity to a new node, keeping the original
+    dataset = flt1.datasets[0]
+    raw_file = dataset.gravity
+    original = HDF5Manager.load_data(raw_file, hdf5file)
+    report = sync_datasets([flt1], hdf5file, processes=1, write=True)
+    assert dataset.raw_gravity is raw_file
+    assert dataset.gravity is not raw_file
+    assert dataset.gravity.nodepath != raw_file.nodepath
+    HDF5Manager.clear_cache()
+    pd.testing.assert_frame_equal(original,
+                                  HDF5Manager.load_data(raw_file, hdf5file))
+    shifted = HDF5Manager.load_data(dataset.gravity, hdf5file)
+    assert shifted.index.equals(original.index)
+    assert list(shifted.columns) == list(original.columns)
+    assert not shifted['gravity'].equals(original['gravity'])
+
+    # the written gravity is synchronized with the trajectory
+    synced = Flight('Synced')
+    synced.datasets.append(DataSet(dataset.gravity, dataset.trajectory))
+    report = sync_datasets([synced], hdf5file, processes=1)
+    assert abs(report['delay'].iloc[0]) < 0.05
+
+    report = sync_datasets([synced], hdf5file, processes=1, window=300)
+    assert abs(report['delay'].iloc[0]) < 0.05
+
+    # synchronizing again uses the original gravity, and replaces the
+    # previously synchronized node
+    report = sync_datasets([flt1], hdf5file, processes=1, write=True)
+    assert abs(report['delay'].iloc[0] + 1.3) < 0.05
+    assert dataset.raw_gravity is raw_file
+    assert dataset.gravity is synced.datasets[0].gravity
+
+
+def test_sync_datasets_at1a(tmpdir, hdf5file: Path):
+    # AT1A file of gravity lagging the trajectory by 1.3 s, with a status word
+    # toggling every 10 s and a 2 s gap in the data
+    t = np.arange(0, 600, 0.1)
+    index = pd.Timestamp('2017-07-27') + pd.to_timedelta(t, unit='s')
+    t_ext = np.arange(-10, 610, 0.1)
+    index_ext = index[0] + pd.to_timedelta(t_ext, unit='s')
+    kin_accel = kinematic_accel(_trajectory(t_ext - 1.3, index_ext)).values[100:-100]
+    raw = pd.DataFrame({'gravity': kin_accel, 'long_accel': 0., 'cross_accel': 0.,
+                        'beam': 0., 'temp': 0.,
+                        'status': np.where(t // 10 % 2 == 0, 21061, 21063),
+                        'pressure': 0., 'Etemp': 0., 'gps_week': 1959,
+                        'gps_sow': 345600 + t})
+    raw = raw.drop(range(3000, 3020))
+    path = Path(str(tmpdir.join('at1a.dat')))
+    raw.to_csv(path, header=False, index=False)
+
+    gravity = read_at1a(path, dtype_profile='at1a_compact')
+    gap = gravity['gps_sow'].isnull()
+    assert 20 == gap.sum()
+    trajectory = _trajectory(t, gravity.index)
+
+    grav_file = DataFile(DataType.GRAVITY, datetime.now(), path,
+                         column_format='at1a_compact')
+    traj_file = DataFile(DataType.TRAJECTORY, datetime.now(), Path('at1a.txt'))
+    HDF5Manager.save_data(gravity, grav_file, hdf5file)
+    HDF5Manager.save_data(trajectory, traj_file, hdf5file)
+    HDF5Manager.clear_cache()
+    flight = Flight('AT1A')
+    dataset = DataSet(grav_file, traj_file, name='at1a')
+    flight.datasets.append(dataset)
+
+    report = sync_datasets([flight], hdf5file, processes=1, write=True)
+    assert abs(report['delay'].iloc[0] + 1.3) < 0.05
+    # the frames are loaded for the synchronization only
+    assert grav_file not in HDF5Manager._cache
+    assert traj_file not in HDF5Manager._cache
+    assert dataset.gravity not in HDF5Manager._cache
+
+    pd.testing.assert_frame_equal(gravity,
+                                  HDF5Manager.load_data(grav_file, hdf5file),
+                                  check_dtype=False)
+    shifted = HDF5Manager.load_data(dataset.gravity, hdf5file)
+    assert shifted.index.equals(gravity.index)
+    # status words are not interpolated
+    assert {21061, 21063} == set(shifted['status'].dropna())
+    # the gap is shifted along with the data, and not interpolated over
+    delay = pd.Timedelta(report['delay'].iloc[0], unit='s')
+    inner = shifted['gravity'].iloc[100:-100]
+    missing = inner.index[inner.isnull()]
+    assert 20 <= len(missing) <= 24
+    assert missing[0] >= gap.index[gap][0] + delay - pd.Timedelta('0.3s')
+    assert missing[-1] <= gap.index[gap][-1] + delay + pd.Timedelta('0.3s')
+
+
+def test_project_sync_datasets(prj_ctrl):
+    # the project fixture's DataSet references data which was never imported
+    report = prj_ctrl.sync_datasets(processes=1, write=True)
+    assert 1 == len(report)
+    assert np.isnan(report['delay'].iloc[0])
+    assert report['error'].iloc[0]
@@ -1,6 +1,7 @@
 # coding: utf-8
 import pytest
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 from dgp.lib import time_utils as tu
@@ -38,6 +39,20 @@ def test_leap_seconds():
         tu.leap_seconds(minutes=dt)
 
 
+def test_leap_seconds_array():
+    dates = pd.DatetimeIndex(['1980-06-01', '1999-03-15', '2015-06-30 23:59:59',
+                              '2015-07-01', '2016-12-31 23:59:59.9',
+                              '2017-01-01', '2017-07-25 13:01:38'])
+    expected = [tu.leap_seconds(datetime=dt.to_pydatetime()) for dt in dates]
+
+    res = tu.leap_seconds_array(dates)
+    assert expected == list(res)
+    assert [16, 17, 17, 18] == list(res[2:6])
+
+    res_utc = tu.leap_seconds_array(dates.tz_localize('UTC'))
+    assert expected == list(res_utc)
+
+
 def test_convert_gps_time():
     gpsweek = 1959
     gpsweeksecond = 219698.000
@@ -74,3 +89,108 @@ def test_datetime_to_sow():
     expected_iter = [expected]*20
     given_iter = tu.datetime_to_sow(dt_series)
     assert expected_iter == given_iter
+
+
+def test_gps_to_datetime64():
+    weeks = np.array([1941, 1941, 1941, 1941])
+    seconds = np.array([295139.2, 295139.3, 604799.999999999, np.nan])
+    res = tu.gps_to_datetime64(weeks, seconds)
+    expected = np.array(['2017-03-22T09:58:59.200', '2017-03-22T09:58:59.300',
+                         '2017-03-25T23:59:59.999999999', 'NaT'],
+                        dtype='datetime64[ns]')
+    np.testing.assert_array_equal(expected, res)
+
+    # integer seconds of week
+    res_int = tu.gps_to_datetime64(weeks[:1], np.array([295139]))
+    assert np.datetime64('2017-03-22T09:58:59', 'ns') == res_int[0]
+
+    # round trip
+    index = pd.DatetimeIndex(res[:3])
+    week, sow = tu.datetime_to_gps(index)
+    np.testing.assert_array_equal(weeks[:3], week)
+    assert index.equals(pd.DatetimeIndex(tu.gps_to_datetime64(week, sow)))
+
+
+def test_datetime_from_fields():
+    # day of year, as used by the ZLS format
+    res = tu.datetime_from_fields([2015, 2016], day_of_year=[316, 366],
+                                  hour=[0, 23], minute=[30, 59],
+                                  second=[1, 59])
+    expected = pd.DatetimeIndex([datetime(2015, 11, 12, 0, 30, 1),
+                                 datetime(2016, 12, 31, 23, 59, 59)])
+    assert expected.equals(res)
+
+    # month and day, with fractional seconds
+    res = tu.datetime_from_fields(pd.Series([2017]), month=pd.Series([3]),
+                                  day=pd.Series([22]), hour=9, minute=59,
+                                  second=pd.Series([0.2]))
+    expected = pd.DatetimeIndex([datetime(2017, 3, 22, 9, 59, 0, 200000)])
+    assert expected.equals(res)
+
+    with pytest.raises(ValueError):
+        tu.datetime_from_fields([2017], month=[3])
+
+
+def test_parse_mdy_hms():
+    mdy = pd.Series([' 3/22/2017', '03/22/2017', '12/31/2016', '3/22/2017',
+                     '2/29/2017'])
+    hms = pd.Series([' 9:58:59.20', '10:00:00.123456', '23:59:59', '9:59:00.2',
+                     '0:00:00.0'])
+    expected = pd.DatetimeIndex(['2017-03-22 09:58:59.200',
+                                 '2017-03-22 10:00:00.123456',
+                                 '2016-12-31 23:59:59',
+                                 '2017-03-22 09:59:00.200',
+                                 '2017-03-01 00:00:00'])
+
+    # invalid dates are handed to the generic parser
+    with pytest.raises(ValueError):
+        tu.parse_mdy_hms(mdy, hms)
+
+    res = tu.parse_mdy_hms(mdy[:4], hms[:4])
+    assert expected[:4].equals(res)
+
+    # irregular rows fall back to the generic parser
+    mdy = pd.Series(['3/22/2017', '2017/3/22'])
+    hms = pd.Series(['9:58:59.20', '9:58:59.20'])
+    with pytest.raises(ValueError):
+        tu.parse_mdy_hms(mdy, hms)
+
+    mdy = pd.Series(['3/22/2017', '3-22-2017 '])
+    with pytest.raises(ValueError):
+        tu.parse_mdy_hms(mdy, hms)
+
+
+def test_parse_mdy_hms_generic():
+    # more layouts of the same length than the fast path tries, the last
+    # rows are parsed by the generic parser
+    hms = pd.Series(['9:58:59.20', '19:5:59.20', '9:5:59.200', '19:58:5.20',
+                     '9:58:5.200', '9:58:5.200'])
+    mdy = pd.Series(['3/22/2017'] * len(hms))
+    res = tu.parse_mdy_hms(mdy, hms)
+    expected = pd.to_datetime(mdy + hms, format="%m/%d/%Y%H:%M:%S.%f")
+    assert pd.DatetimeIndex(expected).equals(res)
+
+
+def test_datenum_to_datetime():
+    # datenum(2017, 3, 22) in MATLAB
+    assert tu.datenum_to_datetime(736776) == pd.Timestamp('2017-03-22')
+    assert tu.datenum_to_datetime(719529.5) == pd.Timestamp('1970-01-01 12:00')
+    assert tu.datenum_to_datetime(np.nan) is pd.NaT
+
+    expected = pd.DatetimeIndex(['2017-03-22 09:58:59.2',
+                                 '2017-03-22 09:58:59.3',
+                                 '2017-03-22 09:58:59.3005'])
+    seconds = (expected - pd.Timestamp('2017-03-22')).total_seconds()
+    datenum = pd.Series(736776 + seconds / 86400, name='datenum')
+
+    res = tu.datenum_to_datetime(datenum)
+    assert isinstance(res, pd.Series)
+    error = (pd.DatetimeIndex(res) - expected).total_seconds()
+    assert abs(error).max() < 1e-5
+
+    res = tu.datenum_to_datetime(datenum.values)
+    assert isinstance(res, pd.DatetimeIndex)
+
+    res = tu.datenum_to_datetime(np.array([736776, np.nan, np.inf]))
+    assert res[0] == pd.Timestamp('2017-03-22')
+    assert res[1:].isnull().all()
@@ -5,7 +5,10 @@ import unittest
 import numpy as np
 import pandas as pd
 
-from dgp.lib.timesync import find_time_delay, shift_frame
+from dgp.lib.timesync import (correlate_lags, find_time_delay, shift_frame,
+                              interpolate_1d_vector, oversample,
+                              fractional_shift, shift_frames,
+                              find_time_delays, shift_frame_varying)
 
 
 @unittest.skipIf(os.getenv("development", False), "Skip slow unit-tests in dev env")
@@ -19,6 +22,66 @@ class TestTimesync(unittest.TestCase):
         time = find_time_delay(s1, s2, 10)
         self.assertAlmostEqual(rnd_offset, -time, places=2)
 
+    def test_correlate_lags(self):
+        rng = np.random.RandomState(0)
+        s1 = rng.randn(1000)
+        maxlag = 50
+        for s2 in [np.roll(s1, 7), rng.randn(900), rng.randn(30)]:
+            full = np.correlate(s1, s2, mode='full')
+            zero = len(s2) - 1
+            lags = np.arange(-maxlag, maxlag + 1) + zero
+            valid = (lags >= 0) & (lags < len(full))
+            expected = np.zeros(2 * maxlag + 1)
+            expected[valid] = full[lags[valid]]
+
+            for method in ['auto', 'direct', 'fft']:
+                res = correlate_lags(s1, s2, maxlag, method=method)
+                np.testing.assert_allclose(expected, res, atol=1e-9)
+
+        with self.assertRaises(ValueError):
+            correlate_lags(s1, s1, maxlag, method='spectral')
+
+    def test_timedelay_methods(self):
+        rnd_offset = 1.1
+        t1 = np.arange(0, 5000, 0.1, dtype=np.float64)
+        t2 = t1 + rnd_offset
+        s1 = np.sin(0.8 * t1) + np.sin(0.2 * t1)
+        s2 = np.sin(0.8 * t2) + np.sin(0.2 * t2)
+        direct = find_time_delay(s1, s2, 10, method='direct')
+        fft = find_time_delay(s1, s2, 10, method='fft')
+        self.assertAlmostEqual(direct, fft, places=6)
+        self.assertAlmostEqual(rnd_offset, -fft, places=2)
+
+    def test_oversample(self):
+        vector = np.sin(np.arange(50) * 0.3)
+        linear = oversample(vector, 10)
+        self.assertEqual(len(linear), 491)
+        np.testing.assert_array_equal(linear[::10], vector)
+        self.assertAlmostEqual(linear[5], (vector[0] + vector[1]) / 2)
+
+        polyphase = oversample(vector, 10, method='polyphase')
+        self.assertEqual(len(polyphase), 491)
+        np.testing.assert_allclose(polyphase[100:400:10], vector[10:40],
+                                   atol=1e-2)
+
+        interpolated = interpolate_1d_vector(vector, 4)
+        self.assertEqual(len(interpolated), 200)
+        self.assertEqual(interpolated[-1], vector[-1])
+
+        with self.assertRaises(ValueError):
+            oversample(vector, 10, method='cubic')
+
+    def test_timedelay_resolution(self):
+        rnd_offset = 1.137
+        t1 = np.arange(0, 5000, 0.1, dtype=np.float64)
+        t2 = t1 + rnd_offset
+        s1 = np.sin(0.8 * t1) + np.sin(0.2 * t1)
+        s2 = np.sin(0.8 * t2) + np.sin(0.2 * t2)
+        for oversampling in ['linear', 'polyphase']:
+            time = find_time_delay(s1, s2, 10, resolution=True,
+                                   oversampling=oversampling)
+            self.assertAlmostEqual(rnd_offset, -time, places=2)
+
     def test_timedelay_timelike_index(self):
         rnd_offset = 1.1
         now = pd.Timestamp.now()
@@ -115,3 +178,110 @@ class TestTimesync(unittest.TestCase):
 
         res = shift_frame(test_input, 0.11)
         self.assertTrue(res.equals(expected))
+
+    def test_fractional_shift(self):
+        delay = 0.137
+        t = np.arange(0, 300, 0.1)
+        index = pd.Timestamp('2017-01-01') + pd.to_timedelta(t, unit='s')
+        frame = pd.DataFrame({'gravity': np.sin(0.8 * t) + np.sin(0.2 * t),
+                              'flag': t > 100}, index=index)
+        expected = np.sin(0.8 * (t - delay)) + np.sin(0.2 * (t - delay))
+
+        for method, tolerance in [('linear', 1e-2), ('cubic', 1e-6),
+                                  ('sinc', 1e-2)]:
+            res = fractional_shift(frame, delay, method=method)
+            self.assertTrue(res.index.equals(index))
+            self.assertEqual(res['flag'].dtype, bool)
+            self.assertTrue(np.isnan(res['gravity'].iloc[0]))
+            np.testing.assert_allclose(res['gravity'].values[20:-20],
+                                       expected[20:-20], atol=tolerance)
+
+        # per-sample delay on a series
+        res = fractional_shift(frame['gravity'], np.full(len(t), delay))
+        self.assertEqual(res.name, 'gravity')
+        np.testing.assert_allclose(res.values[20:-20], expected[20:-20],
+                                   atol=1e-6)
+
+        with self.assertRaises(ValueError):
+            fractional_shift(frame, delay, method='nearest')
+
+    def test_fractional_shift_gaps(self):
+        t = np.arange(0, 60, 0.1)
+        index = pd.Timestamp('2017-01-01') + pd.to_timedelta(t, unit='s')
+        signal = np.sin(0.8 * t)
+        signal[(t >= 20) & (t < 25)] = np.nan
+        status = np.where(t < 30, 21061, 21063).astype(np.uint32)
+        frame = pd.DataFrame({'gravity': signal, 'status': status},
+                             index=index)
+        gap = (t >= 19.9) & (t < 25.2)
+
+        for method in ['linear', 'cubic', 'sinc']:
+            res = fractional_shift(frame, 0.05, method=method)
+            # no values are made up across the gap
+            self.assertTrue(res['gravity'][(t >= 20) & (t < 25.1)].isnull().all())
+            self.assertLess(res['gravity'].dropna().abs().max(), 1.01)
+            if method != 'sinc':
+                self.assertTrue(res['gravity'][~gap].iloc[1:].notnull().all())
+
+            # integer status words take the nearest sample
+            self.assertEqual(res['status'].dtype, np.uint32)
+            self.assertEqual({21061, 21063}, set(res['status']))
+
+        # samples coinciding with the target times are kept next to a gap
+        res = fractional_shift(frame, 0, method='linear')
+        np.testing.assert_array_equal(res['gravity'].values, signal)
+
+    def test_shift_frames_fractional(self):
+        t = np.arange(0, 300, 0.1)
+        index = pd.Timestamp('2017-01-01') + pd.to_timedelta(t, unit='s')
+        gravity = pd.DataFrame({'gravity': np.sin(0.8 * t) + np.sin(0.2 * t)},
+                               index=index)
+        gps = pd.DataFrame({'lat': t, 'gravity': t}, index=index)
+        eotvos = np.sin(0.8 * (t + 1.1)) + np.sin(0.2 * (t + 1.1))
+
+        res = shift_frames(gravity, gps, eotvos, method='cubic')
+        self.assertTrue(res.index.equals(index))
+        self.assertEqual(['gravity', 'lat', 'gravity_gps'], list(res.columns))
+
+        delay = find_time_delay(gravity['gravity'].values, eotvos, 10)
+        expected = fractional_shift(gravity['gravity'], delay)
+        self.assertTrue(res['gravity'].equals(expected))
+
+    def test_find_time_delays(self):
+        t = np.arange(0, 3600, 0.1)
+        drift = 1.0 + 0.5 * t / 3600
+        index = pd.Timestamp('2017-01-01') + pd.to_timedelta(t, unit='s')
+        s1 = pd.Series(np.sin(0.8 * t) + np.sin(0.2 * t), index=index)
+        s2 = pd.Series(np.sin(0.8 * (t + drift)) + np.sin(0.2 * (t + drift)),
+                       index=index)
+
+        delays = find_time_delays(s1, s2, window=600, processes=1)
+        self.assertEqual(11, len(delays))
+        self.assertEqual(index[0] + pd.Timedelta(seconds=300), delays.index[0])
+        centers = (delays.index - index[0]).total_seconds()
+        np.testing.assert_allclose(-delays.values, 1.0 + 0.5 * centers / 3600,
+                                   atol=0.02)
+
+        parallel = find_time_delays(s1, s2, window=600, processes=2)
+        self.assertTrue(delays.equals(parallel))
+
+        # arrays are indexed by seconds since the first sample
+        unindexed = find_time_delays(s1.values, s2.values, 10, window=600,
+                                     processes=1)
+        np.testing.assert_array_equal(centers, unindexed.index)
+        np.testing.assert_allclose(delays.values, unindexed.values)
+
+    def test_shift_frame_varying(self):
+        t = np.arange(0, 600, 0.1)
+        index = pd.Timestamp('2017-01-01') + pd.to_timedelta(t, unit='s')
+        frame = pd.Series(np.sin(0.8 * t) + np.sin(0.2 * t), index=index)
+        delays = pd.Series([0.1, np.nan, 0.3], index=[0, 300, 600])
+
+        res = shift_frame_varying(frame, delays)
+        delay = 0.1 + 0.2 * t / 600
+        expected = np.sin(0.8 * (t - delay)) + np.sin(0.2 * (t - delay))
+        np.testing.assert_allclose(res.values[10:], expected[10:], atol=1e-6)
+
+        timed = delays.copy()
+        timed.index = index[0] + pd.to_timedelta(timed.index, unit='s')
+        self.assertTrue(res.equals(shift_frame_varying(frame, timed)))
@@ -1,7 +1,11 @@
 # coding: utf-8
 
+import io
 import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 import pandas as pd
 import numpy as np
 
@@ -82,3 +86,230 @@ class TestTrajectoryIngestor(unittest.TestCase):
                                   skiprows=1, timeformat='sow')
 
         self.assertTrue(df1.equals(df2))
+
+    def test_import_trajectory_gaps(self):
+        fields = ['mdy', 'hms', 'lat', 'long', 'ell_ht', 'ortho_ht', 'num_sats', 'pdop']
+        df, gaps = ti.import_trajectory(os.path.abspath('tests/sample_trajectory.txt'),
+                                        columns=fields, skiprows=1,
+                                        timeformat='hms', gaps=True)
+        self.assertEqual(len(df), 10)
+        self.assertFalse(df.isnull().values.any())
+        self.assertEqual(len(gaps), 1)
+        self.assertEqual(gaps['count'].iloc[0], 1)
+        self.assertEqual(gaps['start'].iloc[0], pd.Timestamp('2017-03-22 09:58:59.400'))
+
+    def test_import_trajectory_serial(self):
+        fields = ['week', 'sow', 'lat', 'long', 'ell_ht', 'ortho_ht', 'num_sats', 'pdop']
+        expected = ti.import_trajectory(os.path.abspath('tests/sample_trajectory_week-sow.txt'),
+                                        columns=fields, skiprows=1, timeformat='sow')
+
+        # rewrite the sample trajectory with MATLAB serial date numbers
+        raw = pd.read_csv(os.path.abspath('tests/sample_trajectory_week-sow.txt'),
+                          header=None, skiprows=1)
+        times = expected.dropna().index
+        seconds = (times - pd.Timestamp('1970-01-01')).total_seconds()
+        raw[1] = 719529 + seconds / 86400
+        buffer = io.StringIO(raw.iloc[:, 1:].to_csv(header=False, index=False,
+                                                    float_format='%.12f'))
+
+        df = ti.import_trajectory(buffer, timeformat='serial',
+                                  columns=['datenum', 'lat', 'long', 'ell_ht',
+                                           'ortho_ht', 'num_sats', 'pdop'])
+        self.assertTrue(df.index.equals(expected.index))
+        np.testing.assert_array_equal(df['lat'], expected['lat'])
+
+        # sub-millisecond times are kept
+        offset = pd.Timedelta(microseconds=300)
+        raw[1] = 719529 + (seconds + offset.total_seconds()) / 86400
+        buffer = io.StringIO(raw.iloc[:, 1:].to_csv(header=False, index=False,
+                                                    float_format='%.12f'))
+        df = ti.import_trajectory(buffer, timeformat='serial',
+                                  columns=['datenum', 'lat', 'long', 'ell_ht',
+                                           'ortho_ht', 'num_sats', 'pdop'])
+        self.assertTrue(df.index.equals(expected.index + offset))
+        np.testing.assert_array_equal(df['lat'], expected['lat'])
+
+    def test_import_trajectory_utc_leap_second(self):
+        # GPS times straddling the leap second inserted at 2017-01-01
+        sow = np.arange(604780, 604820, 1.0)
+        buffer = io.StringIO('\n'.join('1929,{:.1f},{:.1f}'.format(t, t)
+                                       for t in sow))
+        with self.assertWarnsRegex(UserWarning, '1 sample'):
+            df = ti.import_trajectory(buffer, columns=['week', 'sow', 'value'],
+                                      is_utc=True, interval=1)
+
+        gps = pd.Timestamp('1980-01-06') + pd.to_timedelta(1929 * 604800 + sow,
+                                                           unit='s')
+        self.assertEqual(df.index[0], gps[0] - pd.Timedelta(seconds=17))
+        self.assertEqual(df.index[-1], gps[-1] - pd.Timedelta(seconds=18))
+        self.assertEqual(df['value'].iloc[0], sow[0])
+        self.assertEqual(df['value'].iloc[-1], sow[-1])
+        self.assertFalse(df.index.has_duplicates)
+
+        # at 10 Hz, the second following the leap second falls on the second
+        # preceding it and is dropped, with a warning
+        sow = np.round(np.arange(604798, 604802.05, 0.1), 1)
+        buffer = io.StringIO('\n'.join('1929,{:.1f},{:.1f}'.format(t, t)
+                                       for t in sow))
+        with self.assertWarnsRegex(UserWarning, '10 sample'):
+            df = ti.import_trajectory(buffer, columns=['week', 'sow', 'value'],
+                                      is_utc=True)
+        self.assertEqual(41, len(sow))
+        self.assertEqual(31, df['value'].count())
+        self.assertFalse(df.index.has_duplicates)
+        np.testing.assert_array_equal(df['value'].dropna(),
+                                      np.concatenate([sow[:20], sow[30:]]))
+
+    def test_import_trajectory_whitespace(self):
+        fields = ['week', 'sow', 'lat', 'long', 'ell_ht', 'ortho_ht', 'num_sats', 'pdop']
+        path = os.path.abspath('tests/sample_trajectory_week-sow.txt')
+        expected = ti.import_trajectory(path, columns=list(fields), skiprows=1,
+                                        timeformat='sow')
+
+        # rewrite the sample trajectory as a whitespace delimited export
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        ws_path = os.path.join(tmpdir, 'terrapos.txt')
+        with open(path) as src, open(ws_path, 'w') as dst:
+            for line in src:
+                dst.write('  ' + '   '.join(line.strip().split(',')) + '\n')
+
+        for kwargs in [dict(sep=r'\s+', engine='python'),
+                       dict(delim_whitespace=True),
+                       dict(sep=None),
+                       dict(sep=None, memory_map=True)]:
+            df = ti.import_trajectory(ws_path, columns=list(fields), skiprows=1,
+                                      timeformat='sow', **kwargs)
+            self.assertTrue(df.equals(expected))
+
+        self.assertEqual(ti._detect_sep(path, skiprows=1), ',')
+        self.assertEqual(ti._detect_sep(ws_path, skiprows=1), r'\s+')
+
+    def test_sniff_trajectory(self):
+        hms_path = os.path.abspath('tests/sample_trajectory.txt')
+        profile = ti.sniff_trajectory(hms_path, cache=False)
+        self.assertEqual(profile['timeformat'], 'hms')
+        self.assertEqual(profile['skiprows'], 1)
+        self.assertEqual(profile['sep'], ',')
+        self.assertEqual(profile['columns'][:6], ['mdy', 'hms', 'lat', 'long',
+                                                  'ortho_ht', 'ell_ht'])
+
+        sow_path = os.path.abspath('tests/sample_trajectory_week-sow.txt')
+        fields = ['week', 'sow', 'lat', 'long', 'ell_ht', 'ortho_ht', 'num_sats', 'pdop']
+        expected = ti.import_trajectory(sow_path, columns=list(fields),
+                                        skiprows=1, timeformat='sow')
+        profile = ti.sniff_trajectory(sow_path, cache=False)
+        self.assertEqual(profile['columns'], fields)
+        df = ti.import_trajectory(sow_path, **profile)
+        self.assertTrue(df.equals(expected))
+
+    def test_sniff_trajectory_cached(self):
+        sow_path = os.path.abspath('tests/sample_trajectory_week-sow.txt')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        # headerless, whitespace delimited export
+        ws_path = os.path.join(tmpdir, 'flight1.pos')
+        with open(sow_path) as src, open(ws_path, 'w') as dst:
+            next(src)
+            for line in src:
+                dst.write(' '.join(line.strip().split(',')) + '\n')
+        shutil.copy(ws_path, os.path.join(tmpdir, 'flight2.pos'))
+
+        profile = ti.sniff_trajectory(ws_path)
+        self.assertEqual(profile, {'sep': r'\s+', 'skiprows': None,
+                                   'timeformat': 'sow',
+                                   'columns': ['week', 'sow', 'lat', 'long',
+                                               'ell_ht', None, None, None]})
+        self.assertTrue(os.path.exists(
+            os.path.join(tmpdir, ti.TRAJECTORY_PROFILE_NAME)))
+
+        with mock.patch.object(ti, '_sniff_lines') as sniff:
+            cached = ti.sniff_trajectory(os.path.join(tmpdir, 'flight2.pos'))
+        sniff.assert_not_called()
+        self.assertEqual(cached, profile)
+
+        df = ti.import_trajectory(ws_path, **cached)
+        self.assertEqual(list(df.columns), ['lat', 'long', 'ell_ht'])
+
+        bad_path = os.path.join(tmpdir, 'notes.txt')
+        with open(bad_path, 'w') as fd:
+            fd.write('pilot notes\nno data here\n')
+        with self.assertRaises(ValueError):
+            ti.sniff_trajectory(bad_path)
+
+    def test_sniff_trajectory_cached_mismatch(self):
+        # headerless files of different formats with the same extension
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        paths = {}
+        for timeformat, sample in [('sow', 'sample_trajectory_week-sow.txt'),
+                                   ('hms', 'sample_trajectory.txt')]:
+            paths[timeformat] = os.path.join(tmpdir, timeformat + '.txt')
+            with open(os.path.join('tests', sample)) as src, \
+                    open(paths[timeformat], 'w') as dst:
+                next(src)
+                dst.writelines(src)
+
+        self.assertEqual(ti.sniff_trajectory(paths['sow'])['timeformat'], 'sow')
+        profile = ti.sniff_trajectory(paths['hms'])
+        self.assertEqual(profile['timeformat'], 'hms')
+        df = ti.import_trajectory(paths['hms'], **profile)
+        self.assertEqual(df.index[0], pd.Timestamp('2017-03-22 09:58:59.2'))
+
+        # the profile of the last sniffed format is reused
+        with mock.patch.object(ti, '_sniff_lines') as sniff:
+            self.assertEqual(ti.sniff_trajectory(paths['hms']), profile)
+        sniff.assert_not_called()
+
+    def test_import_trajectories(self):
+        fields = ['week', 'sow', 'lat', 'long', 'ell_ht', 'ortho_ht', 'num_sats', 'pdop']
+        path = os.path.abspath('tests/sample_trajectory_week-sow.txt')
+        expected = ti.import_trajectory(path, columns=fields, skiprows=1,
+                                        timeformat='sow')
+
+        # split the sample into two overlapping sessions, the second with
+        # different values in the overlap
+        with open(path) as fd:
+            lines = fd.readlines()[1:]
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        first = os.path.join(tmpdir, 'session1.txt')
+        second = os.path.join(tmpdir, 'session2.txt')
+        with open(first, 'w') as fd:
+            fd.writelines(lines[:12])
+        with open(second, 'w') as fd:
+            for line in lines[8:]:
+                values = line.strip().split(',')
+                if line in lines[8:12]:
+                    values[2] = '0.0'
+                fd.write(','.join(values) + '\n')
+
+        for processes in [1, 2]:
+            df = ti.import_trajectories([second, first], columns=fields,
+                                        timeformat='sow', processes=processes)
+            self.assertTrue(df.index.equals(expected.index))
+            overlap = expected.dropna().index[8:12]
+            self.assertTrue((df.loc[overlap, 'lat'] == 0).all())
+
+            df = ti.import_trajectories([first, second], columns=fields,
+                                        timeformat='sow', processes=processes)
+            self.assertTrue(df.equals(expected))
+
+        df, gaps = ti.import_trajectories([first, second], columns=fields,
+                                          timeformat='sow', gaps=True)
+        self.assertTrue(df.equals(expected.dropna(how='all')))
+        self.assertTrue(df.index.is_monotonic_increasing)
+        self.assertGreater(len(gaps), 0)
+
+        # options which can't be sent to worker processes are parsed serially
+        with open(path) as fd:
+            header = fd.readline()
+        for session in [first, second]:
+            with open(session) as fd:
+                data = fd.read()
+            with open(session, 'w') as fd:
+                fd.write(header + data)
+        df = ti.import_trajectories([first, second], columns=fields,
+                                    timeformat='sow', skiprows=lambda x: x == 0)
+        self.assertTrue(df.equals(expected))
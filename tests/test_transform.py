@@ -4,13 +4,19 @@ import pandas as pd
 import numpy as np
 from pandas.testing import assert_series_equal
 from functools import partial
+from operator import itemgetter
 
-from dgp.lib.transform.graph import Graph, TransformGraph, GraphError
+from dgp.lib.transform.graph import Graph, TransformGraph, GraphError, _bound_to
+from dgp.lib.transform.transform_graphs import AirbornePost
 from dgp.lib.transform.gravity import eotvos_correction, latitude_correction, free_air_correction
 import dgp.lib.trajectory_ingestor as ti
 
 from tests import sample_dir
 import csv
+import os
+import pickle
+import threading
+import weakref
 
 
 class TestGraph:
@@ -97,6 +103,155 @@ class TestTransformGraph:
         assert res == expected
 
 
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_execute_parallel(self, test_input, executor):
+        g = TransformGraph(graph=test_input, executor=executor, workers=2)
+        res = g.execute()
+        serial = TransformGraph(graph=test_input).execute()
+        assert res == serial
+        assert list(res) == list(serial)
+
+    def test_execute_process_methods(self, test_input):
+        class MethodGraph(TransformGraph):
+            def __init__(self):
+                self.transform_graph = dict(test_input,
+                                            e=(self.pid, 'd'),
+                                            f=(partial(self.pid), 'd'),
+                                            g=(os.getpid,))
+                super().__init__(executor='process', workers=2)
+
+            def pid(self, x):
+                return os.getpid()
+
+        # methods of the graph are not sent to a process
+        res = MethodGraph().execute()
+        assert res['d'] == 6
+        assert res['e'] == res['f'] == os.getpid()
+        assert res['g'] != os.getpid()
+
+    def test_airborne_post_nodes(self):
+        g = AirbornePost(None, None, 0, 0)
+        for node in g.transform_graph.values():
+            if isinstance(node, tuple):
+                assert not _bound_to(node[0], g)
+                pickle.dumps(node[0])
+
+    def test_execute_concurrent(self):
+        # both nodes must be running at once to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def wait(x):
+            barrier.wait()
+            return x
+
+        graph = {'a': 1,
+                 'b': (wait, 'a'),
+                 'c': (wait, 'a'),
+                 'd': (add, 'b', 'c')}
+        g = TransformGraph(graph=graph)
+        res = g.execute(executor='thread', workers=2)
+        assert res == {'a': 1, 'b': 1, 'c': 1, 'd': 2}
+
+        with pytest.raises(ValueError):
+            TransformGraph(graph=graph, executor='cluster').execute()
+
+    @pytest.mark.parametrize('executor', [None, 'thread'])
+    def test_execute_incremental(self, executor):
+        calls = []
+
+        def scale(x, factor=1):
+            calls.append('scale')
+            return x * factor
+
+        def offset(x):
+            calls.append('offset')
+            return x + 1
+
+        def total(x, y):
+            calls.append('total')
+            return x + y
+
+        graph = {'a': 1,
+                 'b': pd.Series([1., 2.]),
+                 'scaled': (partial(scale, factor=2), 'b'),
+                 'offset': (offset, 'a'),
+                 'total': (total, 'scaled', 'offset')}
+        g = TransformGraph(graph=graph, executor=executor)
+        g.execute()
+        assert sorted(calls) == ['offset', 'scale', 'total']
+
+        # only the nodes downstream of the changed parameter are recomputed
+        calls.clear()
+        g.set_node('scaled', (partial(scale, factor=3), 'b'))
+        res = g.execute()
+        assert sorted(calls) == ['scale', 'total']
+        assert_series_equal(res['total'], pd.Series([5., 8.]))
+
+        # an equal parameter or value does not invalidate the node
+        calls.clear()
+        g.set_node('scaled', (partial(scale, factor=3), 'b'))
+        g.set_node('a', 1)
+        g.execute()
+        assert calls == []
+
+        calls.clear()
+        g.set_node('a', 2)
+        res = g.execute()
+        assert sorted(calls) == ['offset', 'total']
+        assert_series_equal(res['total'], pd.Series([6., 9.]))
+
+        # unhashable values are compared by identity
+        calls.clear()
+        g.graph = dict(g.graph, b=pd.Series([1., 2.]))
+        g.execute()
+        assert sorted(calls) == ['scale', 'total']
+
+        fresh = TransformGraph(graph=g.graph).execute()
+        assert list(res) == list(fresh)
+        assert_series_equal(res['total'], fresh['total'])
+
+    @pytest.mark.parametrize('executor', [None, 'thread'])
+    def test_execute_outputs(self, executor):
+        calls = []
+        refs = {}
+        alive = {}
+
+        def frame(x, name=None):
+            calls.append(name)
+            alive[name] = {k: ref() is not None for k, ref in refs.items()}
+            result = pd.DataFrame({name: [x] * 1000 if np.isscalar(x)
+                                   else x.iloc[:, 0] + 1})
+            refs[name] = weakref.ref(result)
+            return result
+
+        graph = {'a': 1,
+                 'b': (partial(frame, name='b'), 'a'),
+                 'c': (partial(frame, name='c'), 'b'),
+                 'd': (partial(frame, name='d'), 'c'),
+                 'e': (partial(frame, name='e'), 'b')}
+        g = TransformGraph(graph=graph, outputs=['d', 'e'])
+        res = g.execute(executor=executor)
+        assert list(res) == ['d', 'e']
+        assert res['d']['d'].iloc[0] == 3
+        assert res['e']['e'].iloc[0] == 2
+        if executor is None:
+            # c is released once its only consumer d has run
+            assert alive['e'] == {'b': True, 'c': False, 'd': True}
+        assert refs['b']() is None
+        assert refs['c']() is None
+
+        # the released results are recomputed when needed
+        calls.clear()
+        g.set_node('d', (partial(frame, name='x'), 'c'))
+        g.execute(executor=executor)
+        assert sorted(calls) == ['b', 'c', 'x']
+
+        calls.clear()
+        res = g.execute(executor=executor, outputs=['e'])
+        assert calls == []
+        assert list(res) == ['e']
+
+
 class TestCorrections:
     @pytest.fixture
     def trajectory_data(self):
@@ -183,6 +338,20 @@ class TestCorrections:
         # check that the indexes are equal
         assert test_input.index.identical(res['lat_corr'].index)
 
+    @pytest.mark.parametrize('executor', ['thread', 'process'])
+    def test_parallel_corrections(self, trajectory_data, executor):
+        transform_graph = {'trajectory': trajectory_data,
+                           'eotvos': (eotvos_correction, 'trajectory'),
+                           'ell_ht': (itemgetter('ell_ht'), 'trajectory'),
+                           'total': (partial(pd.concat, axis=1), ['eotvos', 'ell_ht'])
+                           }
+        serial = TransformGraph(graph=transform_graph).execute()
+        res = TransformGraph(graph=transform_graph, executor=executor).execute()
+
+        assert list(serial) == list(res)
+        for k in serial:
+            assert serial[k].equals(res[k])
+
     def test_partial(self):
         input_A = pd.Series(np.arange(0, 5), index=['A', 'B', 'C', 'D', 'E'])
         input_B = pd.Series(np.arange(2, 7), index=['A', 'B', 'C', 'D', 'E'])